@@ -1,100 +1,521 @@
 import argparse
+import collections
+import concurrent.futures
+import csv
+import glob
+import gzip
+import importlib.util
+import os
+import re
+import shutil
 import file_reader
-import statistics
+import numpy as np
+import pandas as pd
+
+# Rows of the abundance file parsed per block
+CHUNK_ROWS = 100000
+
+# File extension of each output format. Text formats hold the CPMs with two
+# decimals; Parquet and Feather hold them as float32 columns.
+OUTPUT_FORMATS = {'txt': '.txt', 'tsv.gz': '.tsv.gz',
+                  'parquet': '.parquet', 'feather': '.feather'}
+TEXT_FORMATS = ('txt', 'tsv.gz')
+GZIP_COMPRESSLEVEL = 6
+HAVE_PYARROW = importlib.util.find_spec('pyarrow') is not None
+
+OPERATORS = {'>=': np.greater_equal, '>': np.greater,
+             '<=': np.less_equal, '<': np.less}
+# Spelled out in file names; >= is left out so median>=0.5 keeps the
+# _medianCPM05 names
+OPERATOR_LABELS = {'>=': '', '>': 'gt', '<=': 'le', '<': 'lt'}
+
+# Statistics of the CPMs of each transcript across samples
+ROW_STATISTICS = {
+    'median': lambda cpms: np.median(cpms, axis=1),
+    'mean': lambda cpms: np.mean(cpms, axis=1),
+    'min': lambda cpms: np.min(cpms, axis=1),
+    'max': lambda cpms: np.max(cpms, axis=1),
+}
+# Statistics of the samples in which a transcript meets a CPM condition
+SAMPLE_STATISTICS = {
+    'frac_samples': lambda passed: np.mean(passed, axis=1),
+    'n_samples': lambda passed: np.sum(passed, axis=1),
+}
+
+OPERATOR_PATTERN = r'\s*(>=|<=|>|<)\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)'
+ROW_FILTER_RE = re.compile(
+    r'^({})'.format('|'.join(ROW_STATISTICS)) + OPERATOR_PATTERN + r'$')
+SAMPLE_FILTER_RE = re.compile(
+    r'^({})\(\s*cpm'.format('|'.join(SAMPLE_STATISTICS)) + OPERATOR_PATTERN
+    + r'\s*\)' + OPERATOR_PATTERN + r'$')
+
+CPMFilter = collections.namedtuple(
+    'CPMFilter',
+    ['spec', 'label', 'statistic', 'sample_op', 'sample_threshold', 'op',
+     'threshold'])
+
+DEFAULT_FILTERS = ['median>=0.5']
+DEFAULT_WORKERS = 4
+
+
+def threshold_label(threshold):
+    # 0.5 -> '05' and 0.25 -> '025' as in the _medianCPM05.txt file names,
+    # 1.0 -> '1', 1.5 -> '1p5'; distinct thresholds never share a label
+    text = np.format_float_positional(threshold, trim='-')
+    sign = ''
+    if text.startswith('-'):
+        sign, text = '-', text[1:]
+    if text.startswith('0.'):
+        return sign + text.replace('.', '', 1)
+
+    return sign + text.replace('.', 'p')
+
+
+def parse_filter(spec):
+    # 'median>=0.5' or 'frac_samples(cpm>1)>=0.25'
+    match = ROW_FILTER_RE.match(spec.strip())
+    if match:
+        statistic, op, threshold = match.groups()
+        threshold = float(threshold)
+        label = '{}CPM{}{}'.format(statistic, OPERATOR_LABELS[op],
+                                   threshold_label(threshold))
+        return CPMFilter(spec, label, statistic, None, None, op, threshold)
+
+    match = SAMPLE_FILTER_RE.match(spec.strip())
+    if match:
+        statistic, sample_op, sample_threshold, op, threshold = match.groups()
+        sample_threshold, threshold = float(sample_threshold), float(threshold)
+        label = '{}CPM{}{}_{}{}'.format(
+            statistic, OPERATOR_LABELS[sample_op],
+            threshold_label(sample_threshold), OPERATOR_LABELS[op],
+            threshold_label(threshold))
+        return CPMFilter(spec, label, statistic, sample_op, sample_threshold,
+                         op, threshold)
+
+    statistics = list(ROW_STATISTICS) + [
+        f'{statistic}(cpm OP VALUE)' for statistic in SAMPLE_STATISTICS]
+    raise argparse.ArgumentTypeError(
+        f'expected STAT OP VALUE with STAT one of {", ".join(statistics)}'
+        f' (e.g. median>=0.5 or frac_samples(cpm>1)>=0.25), got {spec!r}')
 
 
 def parse_args():
     parser = argparse.ArgumentParser(
         description=('Normalize the raw counts in the abundance file'))
-    parser.add_argument('--abundance-esp',
-                        help='the *_abundance.esp file output by ESPRESSO',
-                        required=True)
+    input_group = parser.add_mutually_exclusive_group(required=True)
+    input_group.add_argument('--abundance-esp', nargs='+',
+                             help=('the *_abundance.esp file output by ESPRESSO;'
+                                   ' several files, or directories of'
+                                   ' *_abundance.esp files, are normalized in'
+                                   ' parallel, each to <output-path>_<run>'))
+    input_group.add_argument('--count-matrix',
+                             help=('a directory written by --write-count-matrix,'
+                                   ' used instead of the *_abundance.esp file'))
     parser.add_argument('--output-path',
                         help='base path for saving output files (unfiltered, filtered, and ids.txt)',
                         required=True)
+    parser.add_argument('--write-count-matrix',
+                        help=('also save the counts as a memory-mapped float32'
+                              ' matrix with transcript and sample index files'
+                              ' in this directory'))
+    parser.add_argument('--filter', action='append', type=parse_filter,
+                        dest='filters',
+                        help=('a filter such as median>=1, mean>5 or'
+                              ' frac_samples(cpm>1)>=0.25; repeat for several'
+                              ' filters, each written to its own'
+                              ' <output-path>_<filter>.txt and ids file'
+                              ' (default: median>=0.5)'))
+    parser.add_argument('--output-format', nargs='+', default=['txt'],
+                        choices=list(OUTPUT_FORMATS),
+                        help=('formats of the CPM tables: txt, tsv.gz, and'
+                              ' parquet or feather with float32 columns (needs'
+                              ' pyarrow); ID lists are always text'
+                              ' (default: txt)'))
+    parser.add_argument('--workers', type=int,
+                        help=('number of files normalized in parallel'
+                              ' (default: {})'.format(DEFAULT_WORKERS)))
+    parser.add_argument('--merged-output',
+                        help=('also write the CPMs of all files as one matrix,'
+                              ' outer-joined on transcript ID, to'
+                              ' <merged-output>_allCPM.<format>'))
 
-    return parser.parse_args()
+    args = parser.parse_args()
+    # Filters with the same label would write to the same files
+    specs_by_label = collections.defaultdict(list)
+    for cpm_filter in args.filters or []:
+        specs_by_label[cpm_filter.label].append(cpm_filter.spec)
+    for label, specs in specs_by_label.items():
+        if len(specs) > 1:
+            parser.error('filters {} are the same filter ({}); give it once'.format(
+                ', '.join(repr(spec) for spec in specs), label))
+    # The counts of --count-matrix are memory-mapped while the new matrix is
+    # written, so the two cannot be the same directory
+    if args.count_matrix and args.write_count_matrix and (
+            os.path.realpath(args.count_matrix)
+            == os.path.realpath(args.write_count_matrix)):
+        parser.error('--write-count-matrix must differ from --count-matrix')
+    # A count matrix is a single run, normalized in this process
+    if args.count_matrix:
+        for option, value in (('--merged-output', args.merged_output),
+                              ('--workers', args.workers)):
+            if value is not None:
+                parser.error(f'{option} only applies to --abundance-esp')
+    if args.workers is None:
+        args.workers = DEFAULT_WORKERS
+    if not HAVE_PYARROW and any(output_format not in TEXT_FORMATS
+                                for output_format in args.output_format):
+        parser.error('Parquet and Feather output need pyarrow; use'
+                     ' --output-format txt or tsv.gz instead')
 
+    return args
 
-def get_totals_by_sample(in_esp_path):
+
+def read_abundance_esp(in_esp_path, chunk_rows=CHUNK_ROWS):
+    # The initial columns (transcript_ID, transcript_name, gene_ID) are kept
+    # verbatim and the sample counts are stacked block by block into one
+    # float matrix, so the file is read only once.
     with open(in_esp_path, 'rt') as in_esp:
-        for line_i, line in enumerate(in_esp):
-            if line_i == 0:
-                initial_headers, sample_headers = (
-                    file_reader.read_abundance_esp_header_line(line))
-                sample_totals = [0] * len(sample_headers)
-                continue
+        initial_headers, sample_headers = (
+            file_reader.read_abundance_esp_header_line(in_esp.readline()))
+        dtypes = {header: str for header in initial_headers}
+        dtypes.update({sample: np.float64 for sample in sample_headers})
+        chunks = pd.read_csv(in_esp, sep='\t', header=None,
+                             names=initial_headers + sample_headers,
+                             dtype=dtypes, keep_default_na=False,
+                             quoting=csv.QUOTE_NONE, chunksize=chunk_rows)
+        initial_blocks = list()
+        count_blocks = list()
+        for chunk in chunks:
+            initial_blocks.append(chunk[initial_headers])
+            count_blocks.append(chunk[sample_headers].to_numpy(dtype=np.float64))
+
+    if not count_blocks:
+        return (pd.DataFrame(columns=initial_headers, dtype=str), sample_headers,
+                np.empty((0, len(sample_headers)), dtype=np.float64))
 
-            values = file_reader.read_abundance_esp_line(line, sample_headers)
-            for i, sample in enumerate(sample_headers):
-                sample_totals[i] += values[sample]
+    initial_columns = pd.concat(initial_blocks, ignore_index=True)
+    return initial_columns, sample_headers, np.vstack(count_blocks)
 
-    return sample_totals
+
+def get_totals_by_sample(counts):
+    # Accumulate row by row (rather than np.sum's pairwise sum) so the totals
+    # match a line-by-line sum exactly.
+    if len(counts) == 0:
+        return np.zeros(counts.shape[1], dtype=np.float64)
+
+    return np.cumsum(counts, axis=0)[-1]
+
+
+def write_count_matrix(matrix_dir, initial_columns, sample_headers, counts,
+                       totals_by_sample):
+    # counts.npy is float32 and can be opened with np.load(mmap_mode='r');
+    # the sample totals are kept from the full-precision counts. The files are
+    # written to a temporary directory that then replaces matrix_dir, so a
+    # matrix being read is never truncated and a failed write leaves the old
+    # one in place.
+    matrix_dir = os.path.normpath(matrix_dir)
+    tmp_dir = f'{matrix_dir}.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    matrix = np.lib.format.open_memmap(
+        os.path.join(tmp_dir, 'counts.npy'), mode='w+', dtype=np.float32,
+        shape=counts.shape)
+    matrix[:] = counts
+    matrix.flush()
+    del matrix
+    np.save(os.path.join(tmp_dir, 'totals.npy'), totals_by_sample)
+
+    with open(os.path.join(tmp_dir, 'transcripts.tsv'), 'wt') as out_f:
+        write_columns(out_f, [[header] for header in initial_columns.columns])
+        write_columns(out_f, [initial_columns[header].to_numpy(dtype=object)
+                              for header in initial_columns.columns])
+    with open(os.path.join(tmp_dir, 'samples.txt'), 'wt') as out_f:
+        write_columns(out_f, [sample_headers])
+
+    old_dir = f'{matrix_dir}.old'
+    if os.path.exists(matrix_dir):
+        os.replace(matrix_dir, old_dir)
+    os.replace(tmp_dir, matrix_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def read_count_matrix(matrix_dir):
+    # The counts are memory-mapped, not read, so only the rows and samples
+    # actually used are paged in.
+    counts = np.load(os.path.join(matrix_dir, 'counts.npy'), mmap_mode='r')
+    totals_by_sample = np.load(os.path.join(matrix_dir, 'totals.npy'))
+    initial_columns = pd.read_csv(
+        os.path.join(matrix_dir, 'transcripts.tsv'), sep='\t', dtype=str,
+        keep_default_na=False, quoting=csv.QUOTE_NONE)
+    with open(os.path.join(matrix_dir, 'samples.txt'), 'rt') as in_f:
+        sample_headers = [line.rstrip('\n') for line in in_f]
+
+    if counts.shape != (len(initial_columns), len(sample_headers)) or \
+            len(totals_by_sample) != len(sample_headers):
+        raise ValueError(
+            f'{matrix_dir} is incomplete: counts {counts.shape} for'
+            f' {len(initial_columns)} transcripts and {len(sample_headers)} samples')
+
+    return initial_columns, sample_headers, counts, totals_by_sample
+
+
+def format_cpms(cpms):
+    # '{:.2f}' text of every CPM, column by column. Most transcripts share a
+    # few values per sample (zero above all), so each distinct value is
+    # formatted once and the strings are gathered back by index.
+    formatted = list()
+    for col in cpms.T:
+        codes, values = pd.factorize(col, use_na_sentinel=False)
+        strings = np.array(['{:.2f}'.format(value) for value in values.tolist()],
+                           dtype=object)
+        formatted.append(strings[codes])
+
+    return formatted
 
 
 def write_columns(out_f, columns):
-    str_columns = list()
-    for col in columns:
-        if isinstance(col, float):
-            str_val = '{:.2f}'.format(col)
+    # columns holds one sequence of strings per output column
+    out_f.writelines('{}\n'.format('\t'.join(row)) for row in zip(*columns))
+
+
+def filter_transcripts(cpms, filters):
+    # One boolean mask per filter; each statistic is computed once however
+    # many filters use it
+    statistics = dict()
+    masks = list()
+    for cpm_filter in filters:
+        key = (cpm_filter.statistic, cpm_filter.sample_op,
+               cpm_filter.sample_threshold)
+        if key not in statistics:
+            if cpm_filter.sample_op is None:
+                statistics[key] = ROW_STATISTICS[cpm_filter.statistic](cpms)
+            else:
+                passed = OPERATORS[cpm_filter.sample_op](
+                    cpms, cpm_filter.sample_threshold)
+                statistics[key] = SAMPLE_STATISTICS[cpm_filter.statistic](passed)
+
+        masks.append(OPERATORS[cpm_filter.op](statistics[key],
+                                              cpm_filter.threshold))
+
+    return masks
+
+
+def cpm_frame(initial_columns, sample_headers, cpms):
+    frame = pd.DataFrame(cpms.astype(np.float32), columns=sample_headers)
+    for header_i, header in enumerate(initial_columns.columns):
+        frame.insert(header_i, header, initial_columns[header].to_numpy())
+
+    return frame
+
+
+def write_cpm_table(out_path, output_format, headers, text_columns, frame,
+                    keep=None):
+    if output_format not in TEXT_FORMATS:
+        if keep is not None:
+            frame = frame[keep].reset_index(drop=True)
+        if output_format == 'parquet':
+            frame.to_parquet(out_path, index=False)
         else:
-            str_val = str(col)
+            frame.to_feather(out_path)
+        return
 
-        str_columns.append(str_val)
+    if keep is not None:
+        text_columns = [col[keep] for col in text_columns]
+    if output_format == 'tsv.gz':
+        out_f = gzip.open(out_path, 'wt', compresslevel=GZIP_COMPRESSLEVEL)
+    else:
+        out_f = open(out_path, 'wt')
+    with out_f:
+        write_columns(out_f, [[header] for header in headers])
+        write_columns(out_f, text_columns)
 
-    out_f.write('{}\n'.format('\t'.join(str_columns)))
 
+def cpm_tables(initial_columns, sample_headers, cpms, output_formats):
+    # Each representation is built once, and only if a format needs it
+    headers = list(initial_columns.columns) + sample_headers
+    text_columns = frame = None
+    if any(output_format in TEXT_FORMATS for output_format in output_formats):
+        text_columns = [initial_columns[header].to_numpy(dtype=object)
+                        for header in initial_columns.columns] + format_cpms(cpms)
+    if any(output_format not in TEXT_FORMATS for output_format in output_formats):
+        frame = cpm_frame(initial_columns, sample_headers, cpms)
 
-def write_normalized_esp(totals_by_sample, in_esp_path, output_base_path):
-    filtered_output_path = f"{output_base_path}_medianCPM05.txt"
-    ids_output_path = f"{output_base_path}__medianCPM05_ids.txt"
-    unfiltered_output_path = f"{output_base_path}_allCPM.txt"
+    return headers, text_columns, frame
 
-    transcript_ids = []
 
-    with open(in_esp_path, 'rt') as in_esp:
-        with open(unfiltered_output_path, 'wt') as unfiltered_out, \
-                open(filtered_output_path, 'wt') as filtered_out, \
-                open(ids_output_path, 'wt') as ids_out:
-
-            for line_i, line in enumerate(in_esp):
-                if line_i == 0:
-                    initial_headers, sample_headers = (
-                        file_reader.read_abundance_esp_header_line(line))
-                    write_columns(unfiltered_out, initial_headers + sample_headers)
-                    write_columns(filtered_out, initial_headers + sample_headers)
-                    continue
-
-                values = file_reader.read_abundance_esp_line(
-                    line, sample_headers)
-                cpms = []
-                for sample_i, sample in enumerate(sample_headers):
-                    sample_val = values[sample]
-                    total = totals_by_sample[sample_i]
-                    cpms.append((sample_val * 1e6) / total)
-
-                # Calculate median CPM
-                median_cpm = statistics.median(cpms)
-
-                # Write unfiltered data
-                initial_columns = [values[h] for h in initial_headers]
-                write_columns(unfiltered_out, initial_columns + cpms)
-
-                # Write filtered data and collect transcript IDs if median CPM >= 0.5
-                if median_cpm >= 0.5:
-                    write_columns(filtered_out, initial_columns + cpms)
-                    transcript_ids.append(initial_columns[0])  # Assuming the first column is the transcript ID
-
-            # Save transcript IDs to ids.txt
-            for transcript_id in transcript_ids:
-                ids_out.write(f"{transcript_id}\n")
+def write_normalized_esp(totals_by_sample, initial_columns, sample_headers,
+                         counts, output_base_path, filters=None,
+                         output_formats=('txt',)):
+    if filters is None:
+        filters = [parse_filter(spec) for spec in DEFAULT_FILTERS]
+
+    cpms = (np.asarray(counts, dtype=np.float64) * 1e6) / totals_by_sample
+    masks = filter_transcripts(cpms, filters)
+    headers, text_columns, frame = cpm_tables(initial_columns, sample_headers,
+                                              cpms, output_formats)
+
+    for output_format in output_formats:
+        extension = OUTPUT_FORMATS[output_format]
+        # Write unfiltered data
+        write_cpm_table(f"{output_base_path}_allCPM{extension}", output_format,
+                        headers, text_columns, frame)
+        # Write filtered data for each filter
+        for cpm_filter, keep in zip(filters, masks):
+            write_cpm_table(f"{output_base_path}_{cpm_filter.label}{extension}",
+                            output_format, headers, text_columns, frame, keep)
+
+    # Save transcript IDs for each filter (the first column is the transcript ID)
+    transcript_ids = initial_columns.iloc[:, 0].to_numpy(dtype=object)
+    for cpm_filter, keep in zip(filters, masks):
+        with open(f"{output_base_path}__{cpm_filter.label}_ids.txt", 'wt') as ids_out:
+            write_columns(ids_out, [transcript_ids[keep]])
+
+        print(f"{cpm_filter.spec}: {int(keep.sum())} of {len(keep)} transcripts"
+              f" kept in {output_base_path}_{cpm_filter.label}.*")
+
+    return cpms
+
+
+def find_abundance_esps(paths):
+    # Files are used as given; directories contribute their *_abundance.esp
+    # files in name order
+    esp_paths = list()
+    for path in paths:
+        if os.path.isdir(path):
+            esp_paths.extend(sorted(glob.glob(os.path.join(path, '*_abundance.esp'))))
+        else:
+            esp_paths.append(path)
+
+    return esp_paths
+
+
+def run_name(esp_path):
+    # ESPRESSO_syn52047893_..._abundance.esp -> ESPRESSO_syn52047893_...
+    name = os.path.basename(esp_path)
+    for suffix in ('_abundance.esp', '.esp'):
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+
+    return name
+
+
+def normalize_abundance_esp(in_esp_path, output_base_path, filters=None,
+                            output_formats=('txt',), count_matrix_dir=None,
+                            return_cpms=False):
+    # One run end to end; with return_cpms, its transcripts and CPMs are
+    # returned for merging
+    initial_columns, sample_headers, counts = read_abundance_esp(in_esp_path)
+    totals_by_sample = get_totals_by_sample(counts)
+    if count_matrix_dir:
+        write_count_matrix(count_matrix_dir, initial_columns, sample_headers,
+                           counts, totals_by_sample)
+    cpms = write_normalized_esp(totals_by_sample, initial_columns,
+                                sample_headers, counts, output_base_path,
+                                filters, output_formats)
+    if return_cpms:
+        return initial_columns, sample_headers, cpms
+
+    return None
+
+
+def merge_cpm_tables(run_names, run_tables):
+    # Outer join on transcript ID: the index of all transcripts is built once,
+    # in first-seen order, and each run's CPMs are placed at its rows with one
+    # get_indexer. A transcript absent from a run has no reads there, so 0 CPM.
+    initial_columns = pd.concat([table[0] for table in run_tables],
+                                ignore_index=True)
+    id_header = initial_columns.columns[0]
+    initial_columns = initial_columns.drop_duplicates(
+        subset=id_header).reset_index(drop=True)
+    transcript_index = pd.Index(initial_columns[id_header])
+
+    # Sample names are prefixed with the run only if they repeat across runs
+    all_samples = [sample for table in run_tables for sample in table[1]]
+    prefix = len(set(all_samples)) < len(all_samples)
+    sample_headers = list()
+    merged = np.zeros((len(transcript_index), len(all_samples)))
+    col = 0
+    for name, (run_initial, run_samples, cpms) in zip(run_names, run_tables):
+        rows = transcript_index.get_indexer(run_initial[id_header])
+        merged[rows, col:col + len(run_samples)] = cpms
+        sample_headers.extend(f'{name}:{sample}' if prefix else sample
+                              for sample in run_samples)
+        col += len(run_samples)
+
+    return initial_columns, sample_headers, merged
+
+
+def write_merged_cpms(output_base_path, initial_columns, sample_headers, cpms,
+                      output_formats=('txt',)):
+    headers, text_columns, frame = cpm_tables(initial_columns, sample_headers,
+                                              cpms, output_formats)
+    for output_format in output_formats:
+        write_cpm_table(
+            f"{output_base_path}_allCPM{OUTPUT_FORMATS[output_format]}",
+            output_format, headers, text_columns, frame)
+
+    print(f"Merged {len(sample_headers)} samples over {len(initial_columns)}"
+          f" transcripts into {output_base_path}_allCPM.*")
+
+
+def normalize_abundance_esps(esp_paths, output_path, filters=None,
+                             output_formats=('txt',), count_matrix_dir=None,
+                             num_workers=DEFAULT_WORKERS, merged_output=None):
+    # Each file is normalized in its own process, to <output_path>_<run>
+    names = [run_name(esp_path) for esp_path in esp_paths]
+    with concurrent.futures.ProcessPoolExecutor(max_workers=num_workers) as executor:
+        futures = [executor.submit(
+            normalize_abundance_esp, esp_path, f"{output_path}_{name}", filters,
+            output_formats,
+            os.path.join(count_matrix_dir, name) if count_matrix_dir else None,
+            merged_output is not None)
+            for esp_path, name in zip(esp_paths, names)]
+        # Results are taken in input order, so the merged columns follow it
+        run_tables = [future.result() for future in futures]
+
+    if merged_output is not None:
+        write_merged_cpms(merged_output,
+                          *merge_cpm_tables(names, run_tables),
+                          output_formats=output_formats)
 
 
 def main():
     args = parse_args()
-    totals_by_sample = get_totals_by_sample(args.abundance_esp)
-    write_normalized_esp(totals_by_sample, args.abundance_esp, args.output_path)
+    if args.count_matrix:
+        initial_columns, sample_headers, counts, totals_by_sample = (
+            read_count_matrix(args.count_matrix))
+        if args.write_count_matrix:
+            write_count_matrix(args.write_count_matrix, initial_columns,
+                               sample_headers, counts, totals_by_sample)
+        write_normalized_esp(totals_by_sample, initial_columns, sample_headers,
+                             counts, args.output_path, args.filters,
+                             args.output_format)
+        return
+
+    esp_paths = find_abundance_esps(args.abundance_esp)
+    if not esp_paths:
+        print(f"No *_abundance.esp files found in {' '.join(args.abundance_esp)}")
+        return
+    names = [run_name(esp_path) for esp_path in esp_paths]
+    if len(set(names)) < len(names):
+        print('Runs must have distinct file names, as outputs are named after them')
+        return
+
+    # A single run keeps the <output-path>_* names, with or without a merged
+    # matrix
+    if len(esp_paths) == 1:
+        run_table = normalize_abundance_esp(
+            esp_paths[0], args.output_path, args.filters, args.output_format,
+            args.write_count_matrix, args.merged_output is not None)
+        if args.merged_output is not None:
+            write_merged_cpms(args.merged_output,
+                              *merge_cpm_tables(names, [run_table]),
+                              output_formats=args.output_format)
+    else:
+        normalize_abundance_esps(esp_paths, args.output_path, args.filters,
+                                 args.output_format, args.write_count_matrix,
+                                 args.workers, args.merged_output)
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -20,7 +20,7 @@ class Annotator:
         self.mode_parser.add_argument(
             "mode",
             metavar="Mode",
-            help="Mode to run the pipeline for.\nList of Modes: smorf_types"
+            help="Mode to run the pipeline for.\nList of Modes: smorf_types, build_index"
         )
 
         # Parse the first set of arguments to get the mode
@@ -28,7 +28,7 @@ class Annotator:
         self.mode = self.args.mode
 
         # Check for supported modes
-        supported_modes = ["smorf_types"]
+        supported_modes = ["smorf_types", "build_index"]
         if self.mode not in supported_modes:
             self.main_parser.error(f"Unsupported mode '{self.mode}'. Supported modes: {', '.join(supported_modes)}")
 
@@ -42,13 +42,16 @@ class Annotator:
         self.general_args = self.parser.add_argument_group("General Parameters")
         self.general_args.add_argument("mode", metavar=self.mode)
         self.general_args.add_argument("--outdir", "-o", help="Inform the output directory", default="Annotator_output")
-        self.general_args.add_argument("--threads", "-p", help="Number of threads to be used.", type=int, default=1)
+        self.general_args.add_argument("--threads", "-p", help="Number of threads to be used. With more than one, smorf_types splits the smORF GTF by chromosome and strand and annotates the shards in that many processes.", type=int, default=1)
+        self.general_args.add_argument("--profile", help="Run every pipeline stage under cProfile and write <outdir>/profile/<stage>.pstats (per-stage timings and memory are always written to <outdir>/run_report.json)", action="store_true")
 
         # Add mode-specific arguments
         self.__configure_mode()
 
         # Parse the full set of arguments
         args = self.parser.parse_args()
+        if self.mode == 'smorf_types' and args.regions and args.incremental:
+            self.parser.error("--regions cannot be combined with --incremental, which needs the whole smORF GTF")
 
         # Ensure output directory exists
         os.makedirs(args.outdir, exist_ok=True)
@@ -58,20 +61,37 @@ class Annotator:
     def __configure_mode(self):
         if self.mode == 'smorf_types':
             self.__set_annotator_mode()
+        elif self.mode == 'build_index':
+            self.__set_build_index_mode()
 
     def __set_annotator_mode(self):
         self.modeArguments = self.parser.add_argument_group("Training mode options")
-        self.modeArguments.add_argument("--smorf_gtf", help="Provide the smORF GTF file", required=True)
-        self.modeArguments.add_argument("--ensembl_gtf", help="Provide the ENSEMBL GTF file", required=True)
+        self.modeArguments.add_argument("--smorf_gtf", help="Provide the smORF GTF file (plain, gzip or bgzip)", required=True)
+        self.modeArguments.add_argument("--ensembl_gtf", help="Provide the ENSEMBL GTF file (plain, gzip or bgzip)", required=True)
         self.modeArguments.add_argument("--intersect_output", help="Provide the intersect output file", default=f"{self.general_args.get_default('outdir')}/intersect.gtf")
         self.modeArguments.add_argument("--non_intersect_output", help="Provide the non-intersect output file", default=f"{self.general_args.get_default('outdir')}/nonintersect.gtf")
         self.modeArguments.add_argument("--output_file", help="Provide the output file", default=f"{self.general_args.get_default('outdir')}/smORF_annotation.txt")
+        self.modeArguments.add_argument("--engine", help="Intersect engine: 'bedtools' shells out twice, 'native' indexes the Ensembl GTF in-process and does both passes at once", choices=["bedtools", "native"], default="bedtools")
+        self.modeArguments.add_argument("--index_dir", help="Directory of the cached Ensembl index used by the native engine (default: <ensembl_gtf>.annotator_index)", default=None)
+        self.modeArguments.add_argument("--classifier", help="Classification kernel: 'loop' parses the intersect output line by line, 'columnar' reads it into arrays with pandas and resolves genes with a lookup table (same output; not used by the sharded --threads mode)", choices=["loop", "columnar"], default="loop")
+        self.modeArguments.add_argument("--keep_intermediates", help="Also write the intersect and non-intersect GTFs to --intersect_output/--non_intersect_output (they are streamed into the classifier otherwise)", action="store_true")
+        self.modeArguments.add_argument("--incremental", help="Only intersect and classify genes whose smORF GTF lines are new or changed since the last run; unchanged genes are reused from --store. The output is the same as a full run; new genes are annotated in one process with the loop classifier and no intermediate files", action="store_true")
+        self.modeArguments.add_argument("--regions", help="Only annotate smORF records overlapping these regions: comma-separated chrom or chrom:start-end (1-based), or a BED file. bgzipped GTFs with a tabix index are read by region", default=None)
+        self.modeArguments.add_argument("--store", help="Per-gene annotation store used by --incremental (default: <outdir>/annotation_store.tsv)", default=None)
+
+    def __set_build_index_mode(self):
+        self.modeArguments = self.parser.add_argument_group("Build index mode options")
+        self.modeArguments.add_argument("--ensembl_gtf", help="Provide the ENSEMBL GTF file", required=True)
+        self.modeArguments.add_argument("--index_dir", help="Directory to write the index to (default: <ensembl_gtf>.annotator_index)", default=None)
 
 
     def execute(self):
         if self.mode == 'smorf_types':
             pipeline = Pipeline(args=self.args)
             pipeline.annotate()
+        elif self.mode == 'build_index':
+            pipeline = Pipeline(args=self.args)
+            pipeline.build_index()
 
 if __name__ == '__main__':
     print("""
@@ -0,0 +1,67 @@
+#!/usr/bin/python3
+"""
+Benchmarks the line-by-line smORF classifier against the columnar kernel on an
+existing intersect file (bedtools intersect -wo output) and checks that both give
+the same per-gene annotations.
+
+    python benchmarks/bench_classifier.py --intersect_file Annotator_output/intersect.gtf
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.pipeline import Pipeline  # noqa: F401  (imports the package in the order Annotator.py does)
+from src.annotation import smORFAnnotator
+from src.annotation.columnar_classifier import ColumnarClassifier
+
+
+def time_classifier(classify, intersect_file, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        with open(intersect_file, 'r') as lines:
+            gene_data = classify(lines)
+        timings.append(time.perf_counter() - start)
+    return min(timings), gene_data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the loop and columnar smORF classifiers")
+    parser.add_argument("--intersect_file", help="Intersect output to classify", required=True)
+    parser.add_argument("--repeats", help="Runs per classifier (best time is reported)", type=int, default=3)
+    parser.add_argument("--chunk_size", help="Rows per chunk for the columnar classifier", type=int, default=500000)
+    args = parser.parse_args()
+
+    with open(args.intersect_file, 'r') as file:
+        records = sum(1 for _ in file)
+
+    annotator = smORFAnnotator(argparse.Namespace(
+        outdir=None, intersect_output=args.intersect_file, non_intersect_output=None,
+        output_file=None, classifier='loop'
+    ))
+    loop_seconds, loop_data = time_classifier(annotator.classify_intersect, args.intersect_file, args.repeats)
+    columnar_seconds, columnar_data = time_classifier(
+        lambda lines: ColumnarClassifier(chunk_size=args.chunk_size).classify(lines),
+        args.intersect_file, args.repeats
+    )
+
+    print(json.dumps({
+        'intersect_file': args.intersect_file,
+        'records': records,
+        'genes': len(loop_data),
+        'loop_seconds': round(loop_seconds, 4),
+        'columnar_seconds': round(columnar_seconds, 4),
+        'loop_records_per_sec': round(records / loop_seconds) if loop_seconds else None,
+        'columnar_records_per_sec': round(records / columnar_seconds) if columnar_seconds else None,
+        'speedup': round(loop_seconds / columnar_seconds, 2) if columnar_seconds else None,
+        'identical': list(loop_data.items()) == list(columnar_data.items()),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
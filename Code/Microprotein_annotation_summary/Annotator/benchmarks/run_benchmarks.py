@@ -0,0 +1,282 @@
+#!/usr/bin/python3
+"""
+Benchmark harness for the Annotator smorf_types pipeline.
+
+Generates synthetic GTFs (see synthetic_gtf.py), then times every stage in a fresh
+process (index build, index load, intersect per engine, classification per kernel)
+plus Pipeline.annotate() end to end, and writes wall time, CPU time, peak RSS and
+records/sec as JSON.
+
+    python benchmarks/run_benchmarks.py --ensembl_records 1000000 --smorf_records 10000 100000
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import resource
+import subprocess
+import multiprocessing
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.pipeline import Pipeline
+from src.annotation import BedtoolsRunner, NativeIntersectRunner, smORFAnnotator, GTFIntervalIndex
+from src.annotation.columnar_classifier import ColumnarClassifier
+from synthetic_gtf import write_ensembl_gtf, write_smorf_gtf
+
+
+def make_args(smorf_gtf, ensembl_gtf, outdir, **overrides):
+    """
+    Namespace with the same fields and defaults as `Annotator.py smorf_types`.
+    """
+    args = argparse.Namespace(
+        mode='smorf_types', outdir=outdir, threads=1,
+        smorf_gtf=smorf_gtf, ensembl_gtf=ensembl_gtf,
+        intersect_output=os.path.join(outdir, 'intersect.gtf'),
+        non_intersect_output=os.path.join(outdir, 'nonintersect.gtf'),
+        output_file=os.path.join(outdir, 'smORF_annotation.txt'),
+        engine='bedtools', index_dir=None, keep_intermediates=False, classifier='loop', profile=False,
+        incremental=False, store=None, regions=None,
+    )
+    for key, value in overrides.items():
+        setattr(args, key, value)
+    os.makedirs(outdir, exist_ok=True)
+    return args
+
+
+def count_lines(path):
+    with open(path, 'rb') as file:
+        return sum(1 for _ in file)
+
+
+# === Stages: each returns the number of records it processed ===
+
+def stage_index_build(args):
+    index = GTFIntervalIndex.from_gtf(args.ensembl_gtf)
+    # A compressed GTF is decompressed to a temporary file that only save() would keep
+    if index.lines_path != index.path:
+        os.remove(index.lines_path)
+    return index.rows.size
+
+
+def stage_index_load(args):
+    return GTFIntervalIndex.load_or_build(args.ensembl_gtf, args.index_dir).rows.size
+
+
+def stage_intersect(args):
+    runner = NativeIntersectRunner(args=args) if args.engine == 'native' else BedtoolsRunner(args=args)
+    intersect_lines, non_intersect_lines = runner.stream()
+    for _ in intersect_lines:
+        pass
+    for _ in non_intersect_lines:
+        pass
+    return count_lines(args.smorf_gtf)
+
+
+def stage_classify(args):
+    with open(args.intersect_output, 'r') as lines:
+        if args.classifier == 'columnar':
+            ColumnarClassifier().classify(lines)
+        else:
+            smORFAnnotator(args=args).classify_intersect(lines)
+    return count_lines(args.intersect_output)
+
+
+def stage_end_to_end(args):
+    Pipeline(args=args).annotate()
+    return count_lines(args.smorf_gtf)
+
+
+STAGES = {
+    'index_build': stage_index_build,
+    'index_load': stage_index_load,
+    'intersect': stage_intersect,
+    'classify': stage_classify,
+    'end_to_end': stage_end_to_end,
+}
+
+
+def peak_rss_mb(usage):
+    """
+    Peak resident set size of this process. Linux keeps ru_maxrss across exec, so a
+    spawned process would report its parent's peak; VmHWM is reset and used instead.
+    """
+    try:
+        with open('/proc/self/status', 'r') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return usage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def measure(stage, args):
+    """
+    Runs one stage in the current (fresh) process and returns its measurements.
+    """
+    before = resource.getrusage(resource.RUSAGE_SELF)
+    before_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        records = STAGES[stage](args)
+    wall = time.perf_counter() - start
+    after = resource.getrusage(resource.RUSAGE_SELF)
+    after_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    cpu = (after.ru_utime - before.ru_utime + after.ru_stime - before.ru_stime
+           + after_children.ru_utime - before_children.ru_utime
+           + after_children.ru_stime - before_children.ru_stime)
+    return {
+        'stage': stage,
+        'engine': args.engine,
+        'classifier': args.classifier,
+        'threads': args.threads,
+        'records': int(records),
+        'wall_seconds': round(wall, 4),
+        'cpu_seconds': round(cpu, 4),
+        'peak_rss_mb': round(peak_rss_mb(after), 1),
+        'records_per_sec': round(records / wall) if wall else None,
+    }
+
+
+def measure_into(connection, stage, args):
+    try:
+        connection.send(measure(stage, args))
+    except Exception as error:
+        connection.send(error)
+    finally:
+        connection.close()
+
+
+def run_isolated(stage, args):
+    # A spawned process starts from a clean interpreter, so peak RSS is per stage.
+    # A plain (non-daemonic) Process is used as --threads runs start their own pool.
+    context = multiprocessing.get_context('spawn')
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=measure_into, args=(sender, stage, args))
+    process.start()
+    sender.close()
+    try:
+        result = receiver.recv()
+    except EOFError:
+        result = RuntimeError(f"{stage} benchmark process exited with code {process.exitcode}")
+    process.join()
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def benchmark_scale(smorf_gtf, ensembl_gtf, engines, classifiers, threads):
+    """
+    Intersect, classification and end-to-end measurements for one smORF GTF.
+    """
+    smorf_dir = os.path.dirname(smorf_gtf)
+    results = []
+
+    def args_for(name, **overrides):
+        return make_args(smorf_gtf, ensembl_gtf, os.path.join(smorf_dir, name), **overrides)
+
+    for engine in engines:
+        results.append(run_isolated('intersect', args_for(f'intersect_{engine}', engine=engine)))
+
+    # Materialise one intersect file for the classification stage
+    prepared = args_for('classify', engine=engines[0], keep_intermediates=True)
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        Pipeline(args=prepared).annotate()
+    for classifier in classifiers:
+        results.append(run_isolated('classify', args_for('classify', engine=engines[0], classifier=classifier)))
+
+    for engine in engines:
+        for classifier in classifiers:
+            for thread_count in threads:
+                if thread_count > 1 and classifier != 'loop':
+                    continue  # the sharded mode always classifies with the loop
+                name = f'end_to_end_{engine}_{classifier}_{thread_count}'
+                results.append(run_isolated('end_to_end', args_for(
+                    name, engine=engine, classifier=classifier, threads=thread_count
+                )))
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the Annotator pipeline on synthetic GTFs",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("--ensembl_records", help="Approximate number of synthetic Ensembl GTF lines", type=int, default=200000)
+    parser.add_argument("--smorf_records", help="smORF GTF sizes to benchmark", type=int, nargs='+', default=[10000])
+    parser.add_argument("--engines", help="Intersect engines to benchmark", nargs='+', choices=["bedtools", "native"], default=["native", "bedtools"])
+    parser.add_argument("--classifiers", help="Classification kernels to benchmark", nargs='+', choices=["loop", "columnar"], default=["loop", "columnar"])
+    parser.add_argument("--threads", help="Thread counts for the end-to-end runs", type=int, nargs='+', default=[1])
+    parser.add_argument("--workdir", help="Directory for generated data and outputs", default="bench_work")
+    parser.add_argument("--output", help="JSON report path", default="benchmark_results.json")
+    parser.add_argument("--seed", help="Random seed for the synthetic data", type=int, default=1)
+    parser.add_argument("--keep_data", help="Keep the generated GTFs and outputs", action="store_true")
+    args = parser.parse_args()
+
+    engines = [engine for engine in args.engines if engine != 'bedtools' or shutil.which('bedtools')]
+    if len(engines) < len(args.engines):
+        print("[!] bedtools not found on PATH, skipping the bedtools engine")
+
+    os.makedirs(args.workdir, exist_ok=True)
+    ensembl_gtf = os.path.join(args.workdir, f'ensembl_{args.ensembl_records}.gtf')
+    print(f"▶️ Generating {ensembl_gtf}")
+    genes = write_ensembl_gtf(ensembl_gtf, args.ensembl_records, seed=args.seed)
+    ensembl_args = make_args(None, ensembl_gtf, args.workdir, engine='native')
+
+    results = [run_isolated('index_build', ensembl_args)]
+    GTFIntervalIndex.load_or_build(ensembl_gtf)
+    results.append(run_isolated('index_load', ensembl_args))
+
+    for smorf_records in args.smorf_records:
+        smorf_dir = os.path.join(args.workdir, f'smorfs_{smorf_records}')
+        os.makedirs(smorf_dir, exist_ok=True)
+        smorf_gtf = os.path.join(smorf_dir, f'smorfs_{smorf_records}.gtf')
+        print(f"▶️ Benchmarking {smorf_records} smORF records")
+        write_smorf_gtf(smorf_gtf, smorf_records, genes, seed=args.seed + 1)
+        for result in benchmark_scale(smorf_gtf, ensembl_gtf, engines, args.classifiers, args.threads):
+            result['smorf_records'] = smorf_records
+            results.append(result)
+
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'config': {
+            'ensembl_records': args.ensembl_records,
+            'ensembl_lines': count_lines(ensembl_gtf),
+            'smorf_records': args.smorf_records,
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as out:
+        json.dump(report, out, indent=2)
+    print(json.dumps(report, indent=2))
+
+    if not args.keep_data:
+        shutil.rmtree(args.workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/python3
+"""
+Generates an Ensembl-like annotation GTF and a ShortStop-like smORF GTF for benchmarking.
+
+The Ensembl file follows the gene -> transcript -> exon/CDS/UTR layout of real Ensembl
+releases with a protein-coding / lncRNA / pseudogene biotype mix. Most smORFs are placed
+inside generated genes so the intersect output has a realistic overlap density.
+
+    python benchmarks/synthetic_gtf.py --ensembl_records 1000000 --smorf_records 100000 --outdir bench_data
+"""
+
+import os
+import random
+import argparse
+
+CHROMOSOMES = [f'chr{i}' for i in range(1, 23)] + ['chrX', 'chrY']
+CHROMOSOME_LENGTH = 150_000_000
+
+# === Biotype mix (weights roughly follow GENCODE/Ensembl gene counts) ===
+GENE_BIOTYPES = [
+    ('protein_coding', 40), ('lncRNA', 35), ('processed_pseudogene', 20),
+    ('unprocessed_pseudogene', 5), ('antisense', 5), ('snRNA', 4), ('misc_RNA', 4),
+]
+CODING_TRANSCRIPT_BIOTYPES = [
+    ('protein_coding', 60), ('retained_intron', 15), ('nonsense_mediated_decay', 12),
+    ('processed_transcript', 10), ('non_stop_decay', 1), ('protein_coding_CDS_not_defined', 2),
+]
+
+
+def weighted_choice(rng, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights=weights)[0]
+
+
+def write_ensembl_gtf(path, n_records, seed=1):
+    """
+    Writes about n_records Ensembl-like lines and returns the generated gene loci
+    as (chrom, start, end, strand).
+    """
+    rng = random.Random(seed)
+    genes = []
+    written = 0
+    with open(path, 'w') as out:
+        out.write('#!genome-build GRCh38.p14\n#!genome-version GRCh38\n')
+        gene_number = 0
+        while written < n_records:
+            chrom = rng.choice(CHROMOSOMES)
+            strand = rng.choice('+-')
+            length = rng.randint(2000, 80000)
+            start = rng.randint(1, CHROMOSOME_LENGTH - length)
+            biotype = weighted_choice(rng, GENE_BIOTYPES)
+            gene_id = f'ENSG{gene_number:011d}'
+            gene_attrs = (f'gene_id "{gene_id}"; gene_version "{rng.randint(1, 20)}"; gene_name "SYN{gene_number}"; '
+                          f'gene_source "ensembl_havana"; gene_biotype "{biotype}";')
+            out.write(f'{chrom}\tensembl_havana\tgene\t{start}\t{start + length}\t.\t{strand}\t.\t{gene_attrs}\n')
+            written += 1
+            genes.append((chrom, start, start + length, strand))
+
+            for transcript_number in range(rng.randint(1, 6)):
+                if biotype == 'protein_coding':
+                    transcript_biotype = weighted_choice(rng, CODING_TRANSCRIPT_BIOTYPES)
+                else:
+                    transcript_biotype = biotype
+                transcript_attrs = (f'{gene_attrs} transcript_id "ENST{gene_number:09d}{transcript_number:02d}"; '
+                                    f'transcript_version "1"; transcript_name "SYN{gene_number}-20{transcript_number}"; '
+                                    f'transcript_source "havana"; transcript_biotype "{transcript_biotype}"; tag "basic";')
+                out.write(f'{chrom}\thavana\ttranscript\t{start}\t{start + length}\t.\t{strand}\t.\t{transcript_attrs}\n')
+                written += 1
+
+                exons = rng.randint(2, 10)
+                position = start
+                for exon_number in range(exons):
+                    exon_length = rng.randint(60, 400)
+                    exon_end = min(position + exon_length, start + length)
+                    exon_attrs = (f'{transcript_attrs} exon_number "{exon_number + 1}"; '
+                                  f'exon_id "ENSE{gene_number:07d}{transcript_number}{exon_number:02d}";')
+                    out.write(f'{chrom}\thavana\texon\t{position}\t{exon_end}\t.\t{strand}\t.\t{exon_attrs}\n')
+                    written += 1
+                    if transcript_biotype == 'protein_coding':
+                        if exon_number == 0:
+                            feature = 'five_prime_utr'
+                        elif exon_number == exons - 1:
+                            feature = 'three_prime_utr'
+                        else:
+                            feature = 'CDS'
+                        out.write(f'{chrom}\thavana\t{feature}\t{position}\t{exon_end}\t.\t{strand}\t.\t{exon_attrs}\n')
+                        written += 1
+                    position = exon_end + rng.randint(100, max(101, length // exons))
+                    if position >= start + length:
+                        break
+            gene_number += 1
+    return genes
+
+
+def write_smorf_gtf(path, n_records, genes, seed=2, genic_fraction=0.7):
+    """
+    Writes n_records smORF lines (a transcript and a CDS line per smORF). A genic_fraction
+    of smORFs is placed inside the given gene loci, the rest anywhere in the genome.
+    """
+    rng = random.Random(seed)
+    with open(path, 'w') as out:
+        for smorf_number in range(max(1, n_records // 2)):
+            if genes and rng.random() < genic_fraction:
+                chrom, gene_start, gene_end, strand = rng.choice(genes)
+                start = rng.randint(gene_start, gene_end)
+            else:
+                chrom = rng.choice(CHROMOSOMES)
+                strand = rng.choice('+-')
+                start = rng.randint(1, CHROMOSOME_LENGTH)
+            length = rng.randint(10, 150) * 3
+            attrs = f'gene_id "smorf_{smorf_number}"; transcript_id "smorf_{smorf_number}.1";'
+            out.write(f'{chrom}\tShortStop\ttranscript\t{start}\t{start + length + 2}\t.\t{strand}\t.\t{attrs}\n')
+            out.write(f'{chrom}\tShortStop\tCDS\t{start}\t{start + length - 1}\t.\t{strand}\t0\t{attrs}\n')
+
+
+def generate(outdir, ensembl_records, smorf_records, seed=1):
+    os.makedirs(outdir, exist_ok=True)
+    ensembl_gtf = os.path.join(outdir, f'ensembl_{ensembl_records}.gtf')
+    smorf_gtf = os.path.join(outdir, f'smorfs_{smorf_records}.gtf')
+    genes = write_ensembl_gtf(ensembl_gtf, ensembl_records, seed=seed)
+    write_smorf_gtf(smorf_gtf, smorf_records, genes, seed=seed + 1)
+    return ensembl_gtf, smorf_gtf
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate synthetic Ensembl and smORF GTFs",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("--ensembl_records", help="Approximate number of Ensembl GTF lines", type=int, default=100000)
+    parser.add_argument("--smorf_records", help="Number of smORF GTF lines", type=int, default=10000)
+    parser.add_argument("--outdir", help="Directory for the generated GTFs", default="bench_data")
+    parser.add_argument("--seed", help="Random seed", type=int, default=1)
+    args = parser.parse_args()
+
+    ensembl_gtf, smorf_gtf = generate(args.outdir, args.ensembl_records, args.smorf_records, args.seed)
+    print(f"[✓] Ensembl GTF: {ensembl_gtf}")
+    print(f"[✓] smORF GTF: {smorf_gtf}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,2 +1,7 @@
 from .bedtools_smorf_intersect import BedtoolsRunner
-from .smorf_annotator import smORFAnnotator
\ No newline at end of file
+from .native_intersect import NativeIntersectRunner
+from .interval_index import GTFIntervalIndex
+from .smorf_annotator import smORFAnnotator
+from .sharded_annotator import ShardedAnnotator
+from .incremental_annotator import IncrementalAnnotator
+from .region_selector import RegionSelector
\ No newline at end of file
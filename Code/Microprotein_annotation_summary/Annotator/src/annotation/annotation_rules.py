@@ -0,0 +1,83 @@
+import re
+
+# === Precompiled Regex for GTF/GFF attributes ===
+ATTR_RE = re.compile(r'(\S+) "([^"]+)"')
+
+def parse_attributes(attr_str):
+    return dict(ATTR_RE.findall(attr_str))
+
+# === Annotation priorities (lower index wins) and biotype groups ===
+PRIORITY_ORDER = ['psORF', 'uoORF','doORF','oORF', 'dORF', 'uORF', 'lncRNA', 'riORF', 'aORF', 'eORF']
+
+PSEUDO_BIOTYPES = {
+    'processed_pseudogene', 'unprocessed_pseudogene', 'translated_unprocessed_pseudogene',
+    'translated_processed_pseudogene', 'transcribed_processed_pseudogene',
+    'transcribed_unprocessed_pseudogene', 'unitary_pseudogene', 'polymorphic_pseudogene'
+}
+
+NONCODING_BIOTYPES = {'lncRNA', 'lincRNA', 'antisense', 'sense_intronic', 'sense_overlapping'}
+
+def get_priority(annot):
+    return PRIORITY_ORDER.index(annot) if annot in PRIORITY_ORDER else float('inf')
+
+# === Ensembl features that decide the annotation regardless of biotype ===
+FEATURE_ANNOTATIONS = {
+    'three_prime_utr': 'dORF',
+    'five_prime_utr': 'uORF',
+    'CDS': 'oORF',
+    'retrotransposed': 'psORF',
+}
+
+def classify_overlap(feature_type, transcript_biotype, gene_biotype):
+    """
+    Annotation of one smORF CDS given the Ensembl feature it overlaps.
+    """
+    # === Annotation Logic ===
+    if feature_type in FEATURE_ANNOTATIONS:
+        return FEATURE_ANNOTATIONS[feature_type]
+    elif transcript_biotype in PSEUDO_BIOTYPES:
+        return 'psORF'
+    elif any(x in transcript_biotype for x in [
+        'non_stop_decay', 'nonsense_mediated_decay',
+        'ambiguous_orf', 'protein_coding_CDS_not_defined']):
+        return 'aORF'
+    elif 'retained_intron' in transcript_biotype:
+        return 'riORF'
+    elif gene_biotype in NONCODING_BIOTYPES:
+        return 'lncRNA'
+    elif feature_type == 'exon':
+        return 'eORF'
+    else:
+        return 'UA'
+
+def resolve_conflict(gene_data, gene_id, annotation, gene_name):
+    """
+    Folds one line's annotation into gene_data, a defaultdict of (annotation, gene_name).
+    These are the reference rules; GeneTable applies them through a precomputed table.
+    """
+    # === Conflict Resolution ===
+    existing_annotation, _ = gene_data[gene_id]
+    
+    if gene_id not in gene_data:
+        gene_data[gene_id] = (annotation, gene_name)
+    else:
+        existing_annotation, _ = gene_data[gene_id]
+
+        # Handle combined upstream + overlapping
+        if {existing_annotation, annotation} == {'uORF', 'oORF'}:
+            gene_data[gene_id] = ('uoORF', gene_name)
+
+        # Handle combined downstream + overlapping
+        elif {existing_annotation, annotation} == {'dORF', 'oORF'}:
+            gene_data[gene_id] = ('doORF', gene_name)
+
+        # Handle upstream + downstream (rare)
+        elif {existing_annotation, annotation} == {'uORF', 'dORF'}:
+            gene_data[gene_id] = ('udORF', gene_name)
+
+        # Keep whichever has higher priority (lower index)
+        elif get_priority(annotation) < get_priority(existing_annotation):
+            gene_data[gene_id] = (annotation, gene_name)
+    
+    if get_priority(annotation) < get_priority(existing_annotation):
+        gene_data[gene_id] = (annotation, gene_name)
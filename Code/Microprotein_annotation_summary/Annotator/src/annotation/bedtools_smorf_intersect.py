@@ -1,4 +1,6 @@
+import threading
 import subprocess
+from contextlib import nullcontext
 from ..pipeline import PipelineStructure
 
 class BedtoolsRunner(PipelineStructure):
@@ -9,11 +11,15 @@ class BedtoolsRunner(PipelineStructure):
         self.intersect_file = args.intersect_output
         self.non_intersect_file = args.non_intersect_output
 
+    def __intersect_command(self):
+        return ['bedtools', 'intersect', '-wo', '-s', '-a', self.smorf_gtf, '-b', self.ensembl_gtf]
+
+    def __non_intersect_command(self):
+        return ['bedtools', 'intersect', '-v', '-s', '-a', self.smorf_gtf, '-b', self.ensembl_gtf]
+
     def run_intersect(self):
         # Define the command for intersect
-        intersect_command = [
-            'bedtools', 'intersect', '-wo', '-s', '-a', self.smorf_gtf, '-b', self.ensembl_gtf
-        ]
+        intersect_command = self.__intersect_command()
 
         # Execute the intersect command and redirect the output to a file
         with open(self.intersect_file, 'w') as outfile:
@@ -23,12 +29,49 @@ class BedtoolsRunner(PipelineStructure):
 
     def run_non_intersect(self):
         # Define the command for non-intersect
-        non_intersect_command = [
-            'bedtools', 'intersect', '-v', '-s', '-a', self.smorf_gtf, '-b', self.ensembl_gtf
-        ]
+        non_intersect_command = self.__non_intersect_command()
 
         # Execute the non-intersect command and redirect the output to a file
         with open(self.non_intersect_file, 'w') as outfile:
             subprocess.run(non_intersect_command, stdout=outfile, check=True)
 
         print(f"Non-intersect output file '{self.non_intersect_file}' created successfully.")
+
+    def run(self):
+        self.run_intersect()
+        self.run_non_intersect()
+
+    def stream(self, keep_intermediates=False):
+        """
+        Starts both bedtools passes at once and returns (intersect lines, non-intersect lines).
+        The intersect lines are read straight from the bedtools pipe; the non-intersect pass
+        is drained in a background thread and its lines become available once the intersect
+        lines have been consumed. Files are only written when keep_intermediates is set.
+        """
+        non_intersect_command = self.__non_intersect_command()
+        non_intersect_process = subprocess.Popen(non_intersect_command, stdout=subprocess.PIPE, text=True)
+        non_intersect_lines = []
+        reader = threading.Thread(target=non_intersect_lines.extend, args=(non_intersect_process.stdout,))
+        reader.start()
+
+        def intersect_lines():
+            intersect_command = self.__intersect_command()
+            process = subprocess.Popen(intersect_command, stdout=subprocess.PIPE, text=True)
+            with open(self.intersect_file, 'w') if keep_intermediates else nullcontext() as outfile:
+                for line in process.stdout:
+                    if outfile is not None:
+                        outfile.write(line)
+                    yield line
+            if process.wait() != 0:
+                raise subprocess.CalledProcessError(process.returncode, intersect_command)
+
+        def non_intersect():
+            reader.join()
+            if non_intersect_process.wait() != 0:
+                raise subprocess.CalledProcessError(non_intersect_process.returncode, non_intersect_command)
+            if keep_intermediates:
+                with open(self.non_intersect_file, 'w') as outfile:
+                    outfile.writelines(non_intersect_lines)
+            yield from non_intersect_lines
+
+        return intersect_lines(), non_intersect()
@@ -0,0 +1,156 @@
+import numpy as np
+import pandas as pd
+from operator import itemgetter
+from .annotation_rules import classify_overlap, parse_attributes, FEATURE_ANNOTATIONS
+from .gene_table import ANNOTATIONS, ANNOTATION_CODES, build_transition_table
+
+# === Columns of `bedtools intersect -wo` output read by the classifier ===
+# 8: smORF attributes, 11: Ensembl feature, 17: Ensembl attributes
+INTERSECT_COLUMNS = itemgetter(8, 11, 17)
+INTERSECT_WIDTH = 19
+
+
+def last_attribute(attrs, key, default):
+    """
+    Value of the last `key "value"` pair in a GTF attribute string, found with str.rfind
+    instead of parsing every pair. Matches parse_attributes(attrs).get(key, default) for
+    well-formed attributes (pairs separated by whitespace).
+    """
+    token = f'{key} "'
+    end = len(attrs)
+    while True:
+        start = attrs.rfind(token, 0, end)
+        if start < 0:
+            return default
+        value_start = start + len(token)
+        value_end = attrs.find('"', value_start)
+        if (start == 0 or attrs[start - 1].isspace()) and value_end > value_start:
+            return attrs[value_start:value_end]
+        end = start
+
+
+def factorize(values):
+    return pd.factorize(np.array(values, dtype=object))
+
+
+class ColumnarClassifier:
+    """
+    Array-based equivalent of smORFAnnotator.classify_intersect.
+
+    Only the three needed columns of the CDS rows are kept. Attribute strings are factorized
+    so every distinct string is parsed once, (feature, transcript biotype, gene biotype)
+    combinations are mapped to annotation codes through a lookup table, and per-gene
+    conflicts are reduced with the transition table, one occurrence rank at a time, so
+    the result matches the line-by-line loop. Gene names are only parsed for the rows
+    that end up naming a gene.
+    """
+
+    def __init__(self, chunk_size=500000):
+        self.chunk_size = chunk_size
+        next_codes, renames = build_transition_table()
+        self.next_codes = np.array(next_codes, dtype=np.int8)
+        self.renames = np.array(renames, dtype=bool)
+        self.gene_index = {}
+        self.states = np.zeros(0, dtype=np.int8)
+        self.names = np.empty(0, dtype=object)
+
+    def classify(self, lines):
+        """
+        Classifies an open intersect file or any iterable of intersect lines.
+        Returns gene_data in the same order and with the same values as the loop.
+        """
+        for columns in self.__read_chunks(lines):
+            self.feed(*columns)
+        return self.gene_data()
+
+    def __read_chunks(self, lines):
+        rows = []
+        for line in lines:
+            if not line.startswith('chr'):
+                continue
+            parts = line.split('\t')
+            if parts[2] != 'CDS':
+                continue
+            if len(parts) >= INTERSECT_WIDTH:
+                rows.append(INTERSECT_COLUMNS(parts))
+            else:
+                # Same fallbacks as the loop for truncated lines
+                parts = line.strip().split('\t')
+                rows.append((parts[8], parts[11] if len(parts) > 11 else 'exon', parts[17] if len(parts) > 17 else parts[8]))
+            if len(rows) >= self.chunk_size:
+                yield zip(*rows)
+                rows = []
+        if rows:
+            yield zip(*rows)
+
+    def feed(self, smorf_attributes, features, ensembl_attributes):
+        smorf_codes, smorf_uniques = factorize(smorf_attributes)
+        feature_codes, feature_uniques = factorize(features)
+        ensembl_codes, ensembl_uniques = factorize(ensembl_attributes)
+
+        # Biotypes are only needed where the feature alone does not decide the annotation
+        decisive = np.array([feature in FEATURE_ANNOTATIONS for feature in feature_uniques], dtype=bool)
+        transcript_biotypes = np.full(len(ensembl_uniques), 'Unknown', dtype=object)
+        gene_biotypes = np.full(len(ensembl_uniques), 'Unnamed', dtype=object)
+        for code in np.unique(ensembl_codes[~decisive[feature_codes]]).tolist():
+            attrs = ensembl_uniques[code]
+            transcript_biotypes[code] = last_attribute(attrs, 'transcript_biotype', 'Unknown')
+            gene_biotypes[code] = last_attribute(attrs, 'gene_biotype', 'Unnamed')
+
+        # Lookup table of annotation codes over the distinct (feature, biotype, biotype) triples
+        transcript_codes, transcript_uniques = pd.factorize(transcript_biotypes)
+        gene_codes, gene_uniques = pd.factorize(gene_biotypes)
+        triples = (
+            (feature_codes.astype(np.int64) * len(transcript_uniques) + transcript_codes[ensembl_codes])
+            * len(gene_uniques) + gene_codes[ensembl_codes]
+        )
+        triple_codes, triple_uniques = pd.factorize(triples)
+        lookup = np.empty(len(triple_uniques), dtype=np.int8)
+        for i, triple in enumerate(triple_uniques.tolist()):
+            rest, gene_code = divmod(triple, len(gene_uniques))
+            feature_code, transcript_code = divmod(rest, len(transcript_uniques))
+            lookup[i] = ANNOTATION_CODES[classify_overlap(
+                feature_uniques[feature_code], transcript_uniques[transcript_code], gene_uniques[gene_code]
+            )]
+        annotations = lookup[triple_codes]
+
+        # Map genes to global indices in order of first appearance
+        smorf_gene_ids = [parse_attributes(attrs).get('gene_id', 'Unknown') for attrs in smorf_uniques]
+        unique_gene_codes, genes = factorize(smorf_gene_ids)
+        global_codes = np.array(
+            [self.gene_index.setdefault(gene_id, len(self.gene_index)) for gene_id in genes], dtype=np.int64
+        )
+        self.__grow(len(self.gene_index))
+        row_genes = global_codes[unique_gene_codes[smorf_codes]]
+
+        # Apply every gene's k-th line at once, for k = 0, 1, ... (genes are unique within a rank)
+        last_rename = np.full(self.states.size, -1, dtype=np.int64)
+        ranks = pd.Series(row_genes).groupby(row_genes).cumcount().to_numpy()
+        order = np.argsort(ranks, kind='stable')
+        boundaries = np.flatnonzero(np.diff(ranks[order])) + 1
+        for rows in np.split(order, boundaries):
+            genes_k = row_genes[rows]
+            states = self.states[genes_k]
+            incoming = annotations[rows]
+            renamed = self.renames[states, incoming]
+            self.states[genes_k] = self.next_codes[states, incoming]
+            last_rename[genes_k[renamed]] = rows[renamed]
+
+        # Resolve names only for the rows that named a gene last
+        renamed_genes = np.flatnonzero(last_rename >= 0)
+        name_codes = ensembl_codes[last_rename[renamed_genes]]
+        names = {
+            code: parse_attributes(ensembl_uniques[code]).get('gene_name', 'Unnamed')
+            for code in np.unique(name_codes).tolist()
+        }
+        self.names[renamed_genes] = [names[code] for code in name_codes.tolist()]
+
+    def __grow(self, size):
+        added = size - self.states.size
+        if added > 0:
+            self.states = np.concatenate([self.states, np.full(added, ANNOTATION_CODES['UA'], dtype=np.int8)])
+            self.names = np.concatenate([self.names, np.full(added, 'Unknown', dtype=object)])
+
+    def gene_data(self):
+        annotations = np.array(ANNOTATIONS, dtype=object)[self.states]
+        return dict(zip(self.gene_index, zip(annotations.tolist(), self.names.tolist())))
@@ -0,0 +1,98 @@
+import sys
+from array import array
+from collections import defaultdict
+from .annotation_rules import resolve_conflict
+
+# === Annotation codes of the compact gene tables (UA is the state of a newly seen gene) ===
+ANNOTATIONS = ['UA', 'psORF', 'uoORF', 'doORF', 'oORF', 'dORF', 'uORF', 'lncRNA', 'riORF', 'aORF', 'eORF', 'udORF']
+ANNOTATION_CODES = {annotation: code for code, annotation in enumerate(ANNOTATIONS)}
+
+# === Only set after classification, so never part of the transition table ===
+INTERGENIC_CODE = len(ANNOTATIONS)
+STORED_ANNOTATIONS = ANNOTATIONS + ['Intergenic']
+
+
+def build_transition_table():
+    """
+    Precomputes resolve_conflict for every (current, incoming) annotation pair.
+    Returns (next annotation codes, whether the gene name is replaced by the incoming line's)
+    as nested lists indexed [current][incoming].
+    """
+    next_codes = [[0] * len(ANNOTATIONS) for _ in ANNOTATIONS]
+    renames = [[False] * len(ANNOTATIONS) for _ in ANNOTATIONS]
+    for current in ANNOTATIONS:
+        for incoming in ANNOTATIONS:
+            gene_data = defaultdict(lambda: ('UA', 'Unknown'))
+            gene_data['gene'] = (current, None)
+            resolve_conflict(gene_data, 'gene', incoming, 'incoming')
+            annotation, gene_name = gene_data['gene']
+            next_codes[ANNOTATION_CODES[current]][ANNOTATION_CODES[incoming]] = ANNOTATION_CODES[annotation]
+            renames[ANNOTATION_CODES[current]][ANNOTATION_CODES[incoming]] = gene_name == 'incoming'
+    return next_codes, renames
+
+
+class GeneTable:
+    """
+    Compact replacement for the gene_data defaultdict of (annotation, gene_name) tuples.
+
+    Gene IDs map to row indices in first-seen order, annotations are one-byte codes in an
+    array and gene names are interned, so a line only updates two slots instead of building
+    tuples and sets. Per-gene conflicts go through the transition table derived from
+    resolve_conflict. Supports the read and assignment operations the
+    intergenic and output steps use on gene_data.
+    """
+    TRANSITIONS = None
+
+    def __init__(self):
+        if GeneTable.TRANSITIONS is None:
+            GeneTable.TRANSITIONS = build_transition_table()
+        self.next_codes, self.renames = GeneTable.TRANSITIONS
+        self.index = {}
+        self.codes = array('b')
+        self.names = []
+
+    def resolve(self, gene_id, annotation, gene_name):
+        """
+        Folds one line's annotation into the table, like resolve_conflict.
+        """
+        row = self.index.get(gene_id)
+        if row is None:
+            row = self.index[gene_id] = len(self.codes)
+            self.codes.append(0)
+            self.names.append('Unknown')
+        current = self.codes[row]
+        incoming = ANNOTATION_CODES[annotation]
+        self.codes[row] = self.next_codes[current][incoming]
+        if self.renames[current][incoming]:
+            self.names[row] = sys.intern(gene_name)
+
+    def __contains__(self, gene_id):
+        return gene_id in self.index
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, gene_id):
+        row = self.index[gene_id]
+        return STORED_ANNOTATIONS[self.codes[row]], self.names[row]
+
+    def __setitem__(self, gene_id, value):
+        annotation, gene_name = value
+        row = self.index.get(gene_id)
+        if row is None:
+            row = self.index[gene_id] = len(self.codes)
+            self.codes.append(0)
+            self.names.append(gene_name)
+        self.codes[row] = STORED_ANNOTATIONS.index(annotation)
+        self.names[row] = sys.intern(gene_name)
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def items(self):
+        for gene_id, row in self.index.items():
+            yield gene_id, (STORED_ANNOTATIONS[self.codes[row]], self.names[row])
+
+    def values(self):
+        for code, gene_name in zip(self.codes, self.names):
+            yield STORED_ANNOTATIONS[code], gene_name
@@ -0,0 +1,48 @@
+import os
+import gzip
+import shutil
+import subprocess
+
+# === First bytes of a gzip (and so also bgzip) stream ===
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+def is_compressed(path):
+    with open(path, 'rb') as file:
+        return file.read(2) == GZIP_MAGIC
+
+
+def open_gtf(path, mode='r'):
+    """
+    Opens a plain, gzip or bgzip GTF for reading, detected from the file content.
+    mode is 'r' for text or 'rb' for bytes.
+    """
+    if is_compressed(path):
+        return gzip.open(path, 'rt' if mode == 'r' else 'rb')
+    return open(path, mode)
+
+
+def has_tabix_index(path):
+    """
+    True when the GTF can be queried by region: bgzipped, indexed, and tabix is on PATH.
+    """
+    indexed = os.path.exists(f"{path}.tbi") or os.path.exists(f"{path}.csi")
+    return indexed and shutil.which('tabix') is not None and is_compressed(path)
+
+
+def tabix_sequences(path):
+    """
+    Sequence names of a tabix-indexed file, in file order.
+    """
+    result = subprocess.run(['tabix', '-l', path], capture_output=True, text=True, check=True)
+    return result.stdout.split()
+
+
+def tabix_fetch(path, chrom, start, end):
+    """
+    Yields the records of a tabix-indexed file overlapping chrom:start-end (1-based, inclusive).
+    """
+    process = subprocess.Popen(['tabix', path, f"{chrom}:{start}-{end}"], stdout=subprocess.PIPE, text=True)
+    yield from process.stdout
+    if process.wait() != 0:
+        raise subprocess.CalledProcessError(process.returncode, process.args)
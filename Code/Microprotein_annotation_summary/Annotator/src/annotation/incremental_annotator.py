@@ -0,0 +1,179 @@
+import os
+import shutil
+import hashlib
+import argparse
+import tempfile
+from collections import defaultdict
+from ..pipeline import PipelineStructure
+from .interval_index import index_signature
+from .gtf_io import open_gtf
+from .sharded_annotator import ShardedAnnotator, annotate_shard, RECORD_TAG
+from .smorf_annotator import smORFAnnotator, parse_attributes
+
+# === Bump when the stored columns or the annotation rules change so old stores are discarded ===
+STORE_FORMAT_VERSION = 1
+STORE_COLUMNS = ('gene_id', 'hash', 'status', 'rank', 'annotation', 'gene_name')
+
+# === How a gene appears in the output: by its first intersecting CDS line, as Intergenic, or not at all ===
+GENIC, INTERGENIC, ABSENT = 'genic', 'intergenic', 'absent'
+
+
+def default_store_path(outdir):
+    return os.path.join(outdir, 'annotation_store.tsv')
+
+
+class AnnotationStore:
+    """
+    Per-gene annotations of a previous smorf_types run, stored as a TSV.
+
+    Every gene is keyed by a hash of its smORF GTF lines; the whole store is tied to the
+    Ensembl GTF signature (path, size, mtime) and is discarded when that changes.
+    'rank' is the position, among the gene's own lines, of the line that places the gene
+    in the output (its first intersecting CDS line, or first non-intersecting line), so
+    the full-run output order can be rebuilt after other genes are added or removed.
+    """
+    def __init__(self, ensembl_signature, genes=None):
+        self.ensembl_signature = ensembl_signature
+        self.genes = genes if genes is not None else {}
+
+    @classmethod
+    def load(cls, path, ensembl_signature):
+        """
+        Returns the stored genes, or an empty store if the file is missing or was written
+        for another Ensembl GTF or store version.
+        """
+        if not os.path.exists(path):
+            return cls(ensembl_signature)
+        with open(path, 'r') as file:
+            header = file.readline().rstrip('\n').split('\t')
+            if header != ['#annotator_store', str(STORE_FORMAT_VERSION), ensembl_signature]:
+                print(f"[!] '{path}' was built for another Ensembl GTF or version, re-annotating all genes")
+                return cls(ensembl_signature)
+            file.readline()
+            genes = {}
+            for line in file:
+                gene_id, gene_hash, status, rank, annotation, gene_name = line.rstrip('\n').split('\t')
+                genes[gene_id] = (gene_hash, status, int(rank), annotation, gene_name)
+        return cls(ensembl_signature, genes)
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as out:
+            out.write(f"#annotator_store\t{STORE_FORMAT_VERSION}\t{self.ensembl_signature}\n")
+            out.write('\t'.join(STORE_COLUMNS) + '\n')
+            for gene_id, (gene_hash, status, rank, annotation, gene_name) in self.genes.items():
+                out.write(f"{gene_id}\t{gene_hash}\t{status}\t{rank}\t{annotation}\t{gene_name}\n")
+        os.replace(tmp_path, path)
+
+
+class IncrementalAnnotator(PipelineStructure):
+    """
+    smorf_types run that only intersects and classifies genes whose smORF GTF lines are new
+    or changed since the previous run. Unchanged genes are taken from the AnnotationStore
+    and merged with the fresh ones in the order of a full run, so the output is the same.
+    """
+    def __init__(self, args):
+        super().__init__(args)
+        self.smorf_gtf = args.smorf_gtf
+        self.ensembl_gtf = args.ensembl_gtf
+        self.store_path = args.store or default_store_path(args.outdir)
+
+    def run(self):
+        gene_lines, gene_hashes = self.__scan_smorf_gtf()
+        store = AnnotationStore.load(self.store_path, index_signature(self.ensembl_gtf))
+
+        stale = {gene_id for gene_id, gene_hash in gene_hashes.items()
+                 if store.genes.get(gene_id, (None,))[0] != gene_hash}
+        print(f"[✓] {len(gene_hashes) - len(stale)} genes unchanged, annotating {len(stale)} new or changed genes.")
+
+        fresh = self.__annotate_genes(stale, gene_lines) if stale else ([], [], [])
+
+        # Rebuild the records of unchanged genes against their line numbers in the current GTF
+        resolved, intergenic = [], []
+        for gene_id, (_, status, rank, annotation, gene_name) in store.genes.items():
+            if gene_id not in gene_hashes or gene_id in stale:
+                continue
+            if status == GENIC:
+                resolved.append((gene_lines[gene_id][rank], gene_id, annotation, gene_name))
+            elif status == INTERGENIC:
+                intergenic.append((gene_lines[gene_id][rank], gene_id))
+
+        gene_data = ShardedAnnotator.merge([fresh, (resolved, [], intergenic)])
+        smORFAnnotator(args=self.args).write_annotations(gene_data)
+
+        store.genes = self.__store_entries(gene_lines, gene_hashes, gene_data, fresh, store.genes, stale)
+        store.save(self.store_path)
+        print(f"[✓] Annotation store written to {self.store_path}")
+
+    def __scan_smorf_gtf(self):
+        """
+        Returns the line numbers and a content hash of every gene in the smORF GTF,
+        skipping the same lines as the sharded split.
+        """
+        gene_lines = defaultdict(list)
+        hashers = {}
+        with open_gtf(self.smorf_gtf) as file:
+            for record, line in enumerate(file):
+                if not line.strip() or line.startswith(('#', 'track', 'browser')):
+                    continue
+                parts = line.rstrip('\r\n').split('\t')
+                if len(parts) < 9:
+                    continue
+                gene_id = parse_attributes(parts[8]).get('gene_id', 'Unknown')
+                gene_lines[gene_id].append(record)
+                if gene_id not in hashers:
+                    hashers[gene_id] = hashlib.sha1()
+                hashers[gene_id].update(line.rstrip('\r\n').encode() + b'\n')
+        return gene_lines, {gene_id: hasher.hexdigest() for gene_id, hasher in hashers.items()}
+
+    def __annotate_genes(self, genes, gene_lines):
+        """
+        Writes the lines of the given genes, tagged with their line numbers, to a temporary
+        GTF and intersects and classifies it like a single shard.
+        """
+        records = {record for gene_id in genes for record in gene_lines[gene_id]}
+        subset_dir = tempfile.mkdtemp(prefix='incremental_', dir=self.outdir)
+        try:
+            subset_gtf = os.path.join(subset_dir, 'smorf.gtf')
+            with open_gtf(self.smorf_gtf) as file, open(subset_gtf, 'w') as out:
+                for record, line in enumerate(file):
+                    if record in records:
+                        parts = line.rstrip('\r\n').split('\t')
+                        parts[8] = f'{parts[8]} {RECORD_TAG} "{record}";'
+                        out.write('\t'.join(parts) + '\n')
+
+            subset_args = argparse.Namespace(**vars(self.args))
+            subset_args.smorf_gtf = subset_gtf
+            subset_args.intersect_output = f"{subset_gtf}.intersect"
+            subset_args.non_intersect_output = f"{subset_gtf}.nonintersect"
+            subset_args.keep_intermediates = False
+            return annotate_shard(subset_args, set())
+        finally:
+            shutil.rmtree(subset_dir, ignore_errors=True)
+
+    @staticmethod
+    def __store_entries(gene_lines, gene_hashes, gene_data, fresh, previous, stale):
+        """
+        Store entries for every gene of the current GTF: unchanged genes keep their entry,
+        annotated genes get their status and the rank of the line that placed them.
+        """
+        first_record = {gene_id: record for record, gene_id, _, _ in fresh[0]}
+        first_intergenic = {}
+        for record, gene_id in sorted(fresh[2]):
+            first_intergenic.setdefault(gene_id, record)
+
+        genes = {}
+        for gene_id, gene_hash in gene_hashes.items():
+            if gene_id not in stale:
+                genes[gene_id] = previous[gene_id]
+                continue
+            lines = gene_lines[gene_id]
+            if gene_id in first_record:
+                annotation, gene_name = gene_data[gene_id]
+                genes[gene_id] = (gene_hash, GENIC, lines.index(first_record[gene_id]), annotation, gene_name)
+            elif gene_id in first_intergenic:
+                genes[gene_id] = (gene_hash, INTERGENIC, lines.index(first_intergenic[gene_id]),
+                                  'Intergenic', 'Intergenic')
+            else:
+                genes[gene_id] = (gene_hash, ABSENT, 0, '', '')
+        return genes
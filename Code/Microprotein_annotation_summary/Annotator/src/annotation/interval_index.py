@@ -0,0 +1,310 @@
+import os
+import json
+import mmap
+import shutil
+import hashlib
+import tempfile
+import numpy as np
+from .gtf_io import open_gtf, is_compressed
+
+# === GTF lines that bedtools skips when reading an interval file ===
+GTF_SKIP_PREFIXES = (b'#', b'track', b'browser')
+
+# === Bump when the on-disk index layout changes so old caches are rebuilt ===
+INDEX_FORMAT_VERSION = 2
+
+INDEX_ARRAYS = ('starts', 'ends', 'max_ends', 'rows', 'offsets', 'lengths')
+
+
+def index_signature(gtf_path):
+    """
+    Returns the version key of a GTF: a hash of its absolute path, size and mtime
+    together with the index format version.
+    """
+    stat = os.stat(gtf_path)
+    key = f"{os.path.abspath(gtf_path)}\t{stat.st_size}\t{stat.st_mtime_ns}\t{INDEX_FORMAT_VERSION}"
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def default_index_dir(gtf_path):
+    return f"{gtf_path}.annotator_index"
+
+
+def parse_gtf_interval(line):
+    """
+    Returns (chrom, strand, start, end) for a GTF line, or None for headers and
+    malformed lines. The start is converted to 0-based like bedtools does.
+    """
+    if not line.strip() or line.startswith(GTF_SKIP_PREFIXES):
+        return None
+    parts = line.split(b'\t', 7)
+    if len(parts) < 7:
+        return None
+    return parts[0], parts[6], int(parts[3]) - 1, int(parts[4])
+
+
+class GTFIntervalIndex:
+    """
+    Sorted interval arrays for every (chromosome, strand) block of a GTF file.
+
+    Records are kept as byte offsets into the source file, which is memory-mapped,
+    so the original line can be reproduced for `bedtools intersect -wo` style output
+    without holding the whole annotation in memory as Python strings. For gzip/bgzip
+    sources a decompressed copy is kept next to the index and mapped instead.
+    """
+
+    def __init__(self, path, blocks, starts, ends, max_ends, rows, offsets, lengths,
+                 signature=None, lines_path=None):
+        self.path = path
+        self.lines_path = lines_path or path
+        self.signature = signature
+        self.blocks = blocks
+        self.starts = starts
+        self.ends = ends
+        self.max_ends = max_ends
+        self.rows = rows
+        self.offsets = offsets
+        self.lengths = lengths
+        self._file = None
+        self._mm = None
+
+    @classmethod
+    def from_gtf(cls, path, lines_path=None):
+        """
+        Parses the GTF once and builds the per-block sorted arrays. A compressed GTF is
+        decompressed to lines_path (a temporary file by default, moved by save()).
+        """
+        signature = index_signature(path)
+        lines_file = None
+        if is_compressed(path):
+            if lines_path is None:
+                handle, lines_path = tempfile.mkstemp(suffix='.gtf')
+                os.close(handle)
+            lines_file = open(lines_path, 'wb')
+        key_codes = {}
+        keys, starts, ends, offsets, lengths = [], [], [], [], []
+
+        offset = 0
+        with open_gtf(path, 'rb') as file:
+            for line in file:
+                if lines_file is not None:
+                    lines_file.write(line)
+                interval = parse_gtf_interval(line)
+                if interval is not None:
+                    chrom, strand, start, end = interval
+                    keys.append(key_codes.setdefault((chrom, strand), len(key_codes)))
+                    starts.append(start)
+                    ends.append(end)
+                    offsets.append(offset)
+                    lengths.append(len(line.rstrip(b'\r\n')))
+                offset += len(line)
+        if lines_file is not None:
+            lines_file.close()
+
+        keys = np.asarray(keys, dtype=np.int32)
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+
+        # lexsort is stable, so ties on start keep file order
+        rows = np.lexsort((starts, keys))
+        sorted_keys = keys[rows]
+        starts = starts[rows]
+        ends = ends[rows]
+
+        blocks = {}
+        max_ends = np.empty_like(ends)
+        for key, code in key_codes.items():
+            lo = int(np.searchsorted(sorted_keys, code, side='left'))
+            hi = int(np.searchsorted(sorted_keys, code, side='right'))
+            blocks[key] = (lo, hi)
+            np.maximum.accumulate(ends[lo:hi], out=max_ends[lo:hi])
+
+        return cls(
+            path, blocks, starts, ends, max_ends, rows,
+            np.asarray(offsets, dtype=np.int64), np.asarray(lengths, dtype=np.int64),
+            signature=signature, lines_path=lines_path
+        )
+
+    @classmethod
+    def load_or_build(cls, path, index_dir=None):
+        """
+        Loads the cached index for a GTF, rebuilding it when the GTF has changed
+        since the cache was written (different path, size or mtime).
+        """
+        index_dir = index_dir or default_index_dir(path)
+        signature = index_signature(path)
+
+        index = cls.load(index_dir, path)
+        if index is not None and index.signature == signature:
+            print(f"[✓] Loaded Ensembl index '{index_dir}' (version {signature[:12]})")
+            return index
+
+        if index is not None:
+            print(f"[!] Ensembl index '{index_dir}' is stale, rebuilding...")
+        index = cls.from_gtf(path)
+        index.save(index_dir)
+        print(f"[✓] Ensembl index written to '{index_dir}' (version {index.signature[:12]})")
+        return index
+
+    @classmethod
+    def load(cls, index_dir, path=None):
+        """
+        Memory-maps a saved index. Returns None when there is no readable index.
+        """
+        meta_file = os.path.join(index_dir, 'meta.json')
+        if not os.path.exists(meta_file):
+            return None
+        with open(meta_file, 'r') as file:
+            meta = json.load(file)
+        if meta.get('format_version') != INDEX_FORMAT_VERSION:
+            return None
+
+        arrays = {
+            name: np.load(os.path.join(index_dir, f'{name}.npy'), mmap_mode='r')
+            for name in INDEX_ARRAYS
+        }
+        blocks = {
+            (chrom.encode('latin-1'), strand.encode('latin-1')): (lo, hi)
+            for chrom, strand, lo, hi in meta['blocks']
+        }
+        lines_path = os.path.join(index_dir, meta['lines']) if meta.get('lines') else None
+        return cls(path or meta['source'], blocks, signature=meta['signature'],
+                   lines_path=lines_path, **arrays)
+
+    def save(self, index_dir):
+        """
+        Writes the index as one .npy file per column plus a meta.json, replacing any previous index.
+        """
+        tmp_dir = f"{index_dir}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        for name in INDEX_ARRAYS:
+            np.save(os.path.join(tmp_dir, f'{name}.npy'), getattr(self, name))
+
+        # Decompressed copy of a gzip/bgzip source, which line() reads from
+        lines = None
+        if self.lines_path != self.path:
+            lines = 'source.gtf'
+            if os.path.dirname(os.path.abspath(self.lines_path)) == os.path.abspath(index_dir):
+                shutil.copyfile(self.lines_path, os.path.join(tmp_dir, lines))
+            else:
+                shutil.move(self.lines_path, os.path.join(tmp_dir, lines))
+
+        meta = {
+            'format_version': INDEX_FORMAT_VERSION,
+            'signature': self.signature,
+            'source': os.path.abspath(self.path),
+            'lines': lines,
+            'blocks': [
+                [chrom.decode('latin-1'), strand.decode('latin-1'), lo, hi]
+                for (chrom, strand), (lo, hi) in self.blocks.items()
+            ],
+        }
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w') as file:
+            json.dump(meta, file)
+
+        shutil.rmtree(index_dir, ignore_errors=True)
+        os.replace(tmp_dir, index_dir)
+        if lines is not None:
+            self.lines_path = os.path.join(index_dir, lines)
+
+    def open(self):
+        if self._mm is None:
+            self._file = open(self.lines_path, 'rb')
+            if self.offsets.size:
+                self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self._mm = b''
+        return self
+
+    def close(self):
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+        if self._file is not None:
+            self._file.close()
+        self._file = None
+        self._mm = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def line(self, row):
+        """
+        Returns the original GTF line (without newline) for a record number.
+        """
+        offset = int(self.offsets[row])
+        return self._mm[offset:offset + int(self.lengths[row])]
+
+    def query(self, chrom, strand, query_starts, query_ends):
+        """
+        Finds same-strand overlaps for a batch of intervals on one block.
+        Returns, for every query, a list of (record number, overlap bp) in file order.
+        """
+        hits = [[] for _ in range(len(query_starts))]
+        block = self.blocks.get((chrom, strand))
+        if block is None:
+            return hits
+
+        lo, hi = block
+        query_starts = np.asarray(query_starts, dtype=np.int64)
+        query_ends = np.asarray(query_ends, dtype=np.int64)
+
+        # Everything before `left` ends at or before the query start (running max of ends),
+        # everything from `right` on starts at or after the query end.
+        left = lo + np.searchsorted(self.max_ends[lo:hi], query_starts, side='right')
+        right = lo + np.searchsorted(self.starts[lo:hi], query_ends, side='left')
+
+        for i, (q_start, q_end, i_lo, i_hi) in enumerate(zip(
+                query_starts.tolist(), query_ends.tolist(), left.tolist(), right.tolist())):
+            if i_lo >= i_hi:
+                continue
+            selected = np.flatnonzero(self.ends[i_lo:i_hi] > q_start) + i_lo
+            if not selected.size:
+                continue
+            overlaps = (np.minimum(self.ends[selected], q_end)
+                        - np.maximum(self.starts[selected], q_start))
+            rows = self.rows[selected]
+            order = np.argsort(rows, kind='stable')
+            hits[i] = list(zip(rows[order].tolist(), overlaps[order].tolist()))
+
+        return hits
+
+    def iter_overlaps(self, gtf_path, chunk_size=100000):
+        """
+        Streams the query GTF once and yields (line, hits) for every record in file order,
+        where `hits` is the list returned by `query` for that record.
+        """
+        with open_gtf(gtf_path, 'rb') as file:
+            chunk = []
+            for line in file:
+                interval = parse_gtf_interval(line)
+                if interval is None:
+                    continue
+                chunk.append((line.rstrip(b'\r\n'),) + interval)
+                if len(chunk) >= chunk_size:
+                    yield from self.__query_chunk(chunk)
+                    chunk = []
+            if chunk:
+                yield from self.__query_chunk(chunk)
+
+    def __query_chunk(self, chunk):
+        groups = {}
+        for position, (_, chrom, strand, start, end) in enumerate(chunk):
+            groups.setdefault((chrom, strand), []).append(position)
+
+        hits = [[] for _ in chunk]
+        for (chrom, strand), positions in groups.items():
+            block_hits = self.query(
+                chrom, strand,
+                [chunk[p][3] for p in positions],
+                [chunk[p][4] for p in positions]
+            )
+            for position, record_hits in zip(positions, block_hits):
+                hits[position] = record_hits
+
+        for record, record_hits in zip(chunk, hits):
+            yield record[0], record_hits
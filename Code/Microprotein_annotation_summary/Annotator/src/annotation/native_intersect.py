@@ -0,0 +1,64 @@
+from contextlib import nullcontext
+from ..pipeline import PipelineStructure
+from .interval_index import GTFIntervalIndex
+
+class NativeIntersectRunner(PipelineStructure):
+    """
+    In-process replacement for the two `bedtools intersect -s` passes of BedtoolsRunner.
+    The Ensembl GTF is indexed once and the smORF GTF is scanned once, writing the
+    `-wo` overlaps and the `-v` misses at the same time.
+    """
+    def __init__(self, args):
+        super().__init__(args)
+        self.smorf_gtf = args.smorf_gtf
+        self.ensembl_gtf = args.ensembl_gtf
+        self.intersect_file = args.intersect_output
+        self.non_intersect_file = args.non_intersect_output
+        self.index_dir = args.index_dir
+
+    def run(self):
+        index = GTFIntervalIndex.load_or_build(self.ensembl_gtf, self.index_dir)
+
+        # Write both outputs in a single pass over the smORF GTF
+        with index, open(self.intersect_file, 'wb') as intersect_out, \
+                open(self.non_intersect_file, 'wb') as non_intersect_out:
+            for line, hits in index.iter_overlaps(self.smorf_gtf):
+                if not hits:
+                    non_intersect_out.write(line + b'\n')
+                    continue
+                for row, overlap in hits:
+                    intersect_out.write(b'%s\t%s\t%d\n' % (line, index.line(row), overlap))
+
+        print(f"Intersect output file '{self.intersect_file}' created successfully.")
+        print(f"Non-intersect output file '{self.non_intersect_file}' created successfully.")
+
+    def stream(self, keep_intermediates=False):
+        """
+        Returns (intersect lines, non-intersect lines) without writing the intermediate files
+        unless keep_intermediates is set. Both come from the same pass over the smORF GTF:
+        the misses are collected while the overlaps are consumed, so the non-intersect lines
+        must be read after the intersect lines.
+        """
+        non_intersect_lines = []
+
+        def intersect_lines():
+            index = GTFIntervalIndex.load_or_build(self.ensembl_gtf, self.index_dir)
+            with index, open(self.intersect_file, 'w') if keep_intermediates else nullcontext() as outfile:
+                for line, hits in index.iter_overlaps(self.smorf_gtf):
+                    line = line.decode()
+                    if not hits:
+                        non_intersect_lines.append(f"{line}\n")
+                        continue
+                    for row, overlap in hits:
+                        intersect_line = f"{line}\t{index.line(row).decode()}\t{overlap}\n"
+                        if outfile is not None:
+                            outfile.write(intersect_line)
+                        yield intersect_line
+
+        def non_intersect():
+            if keep_intermediates:
+                with open(self.non_intersect_file, 'w') as outfile:
+                    outfile.writelines(non_intersect_lines)
+            yield from non_intersect_lines
+
+        return intersect_lines(), non_intersect()
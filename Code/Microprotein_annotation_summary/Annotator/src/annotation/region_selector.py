@@ -0,0 +1,147 @@
+import os
+import re
+import sys
+import bisect
+import argparse
+from ..pipeline import PipelineStructure
+from .gtf_io import open_gtf, has_tabix_index, tabix_sequences, tabix_fetch
+
+# === chrom, or chrom:start-end with 1-based inclusive coordinates ===
+REGION_RE = re.compile(r'^([^:\s]+)(?::(\d+)-(\d+))?$')
+WHOLE_CHROMOSOME = sys.maxsize
+
+
+def parse_regions(regions):
+    """
+    Parses --regions: comma-separated `chrom` / `chrom:start-end` strings (1-based, inclusive)
+    or the path of a BED file (0-based, half-open). Returns {chrom: (starts, ends)} of sorted,
+    merged 1-based inclusive intervals.
+    """
+    intervals = {}
+    if os.path.isfile(regions):
+        with open_gtf(regions) as file:
+            for line in file:
+                if not line.strip() or line.startswith(('#', 'track', 'browser')):
+                    continue
+                chrom, start, end = line.split('\t')[:3]
+                intervals.setdefault(chrom, []).append((int(start) + 1, int(end)))
+    else:
+        for region in re.split(r'[,\s]+', regions):
+            if not region:
+                continue
+            match = REGION_RE.match(region)
+            if match is None:
+                raise ValueError(f"Invalid region '{region}', expected chrom or chrom:start-end")
+            chrom, start, end = match.groups()
+            if start is None:
+                intervals.setdefault(chrom, []).append((1, WHOLE_CHROMOSOME))
+            else:
+                intervals.setdefault(chrom, []).append((int(start), int(end)))
+
+    merged = {}
+    for chrom, chrom_intervals in intervals.items():
+        starts, ends = [], []
+        for start, end in sorted(chrom_intervals):
+            if starts and start <= ends[-1] + 1:
+                ends[-1] = max(ends[-1], end)
+            else:
+                starts.append(start)
+                ends.append(end)
+        merged[chrom] = (starts, ends)
+    return merged
+
+
+def overlaps(intervals, start, end):
+    starts, ends = intervals
+    i = bisect.bisect_right(starts, end) - 1
+    return i >= 0 and ends[i] >= start
+
+
+class RegionSelector(PipelineStructure):
+    """
+    Restricts a smorf_types run to the smORF records overlapping --regions.
+
+    The selected smORF records are written to a GTF in file order. bgzipped GTFs with a
+    .tbi/.csi index are read with tabix, so only the blocks covering the regions are
+    decompressed; other files are filtered in one scan. The bedtools engine also gets the
+    Ensembl records within the span of the selected smORFs on every chromosome, while the
+    native engine keeps using the cached index of the full Ensembl GTF.
+    """
+    def __init__(self, args):
+        super().__init__(args)
+        self.smorf_gtf = args.smorf_gtf
+        self.ensembl_gtf = args.ensembl_gtf
+        self.regions = parse_regions(args.regions)
+
+    def select(self, region_dir):
+        """
+        Writes the selected records into region_dir and returns (args for the restricted
+        run, number of smORF records selected).
+        """
+        region_args = argparse.Namespace(**vars(self.args))
+        region_args.smorf_gtf = os.path.join(region_dir, 'smorf.gtf')
+        spans = {}
+        selected = 0
+        with open(region_args.smorf_gtf, 'w') as out:
+            for chrom, (start, end), line in self.__smorf_records():
+                out.write(line if line.endswith('\n') else f"{line}\n")
+                span_start, span_end = spans.get(chrom, (start, end))
+                spans[chrom] = (min(span_start, start), max(span_end, end))
+                selected += 1
+        print(f"[✓] Selected {selected} smORF records in {sum(len(s) for s, _ in self.regions.values())} region(s).")
+
+        if self.args.engine == 'bedtools':
+            region_args.ensembl_gtf = os.path.join(region_dir, 'ensembl.gtf')
+            with open(region_args.ensembl_gtf, 'w') as out:
+                for line in self.__ensembl_records(spans):
+                    out.write(line)
+        return region_args, selected
+
+    def __smorf_records(self):
+        """
+        Yields (chrom, (start, end), line) for the smORF records overlapping the regions.
+        """
+        if has_tabix_index(self.smorf_gtf):
+            for chrom in tabix_sequences(self.smorf_gtf):
+                if chrom not in self.regions:
+                    continue
+                # Merged regions can still share long records; keep each once, in file order
+                records = {}
+                for start, end in zip(*self.regions[chrom]):
+                    for line in tabix_fetch(self.smorf_gtf, chrom, start, min(end, 2 ** 31 - 1)):
+                        parts = line.split('\t')
+                        records.setdefault(line, (int(parts[3]), int(parts[4])))
+                for line, interval in sorted(records.items(), key=lambda item: item[1][0]):
+                    yield chrom, interval, line
+            return
+
+        with open_gtf(self.smorf_gtf) as file:
+            for line in file:
+                if not line.strip() or line.startswith(('#', 'track', 'browser')):
+                    continue
+                parts = line.split('\t')
+                if len(parts) < 9 or parts[0] not in self.regions:
+                    continue
+                start, end = int(parts[3]), int(parts[4])
+                if overlaps(self.regions[parts[0]], start, end):
+                    yield parts[0], (start, end), line
+
+    def __ensembl_records(self, spans):
+        """
+        Yields the Ensembl records overlapping each chromosome's span of selected smORFs,
+        in file order.
+        """
+        if has_tabix_index(self.ensembl_gtf):
+            for chrom in tabix_sequences(self.ensembl_gtf):
+                if chrom in spans:
+                    yield from tabix_fetch(self.ensembl_gtf, chrom, *spans[chrom])
+            return
+
+        with open_gtf(self.ensembl_gtf) as file:
+            for line in file:
+                parts = line.split('\t', 5)
+                if len(parts) < 5 or parts[0] not in spans:
+                    continue
+                span_start, span_end = spans[parts[0]]
+                if int(parts[3]) <= span_end and int(parts[4]) >= span_start:
+                    yield line
@@ -0,0 +1,211 @@
+import os
+import re
+import shutil
+import argparse
+import tempfile
+import concurrent.futures
+from collections import defaultdict
+from ..pipeline import PipelineStructure
+from .bedtools_smorf_intersect import BedtoolsRunner
+from .native_intersect import NativeIntersectRunner
+from .interval_index import GTFIntervalIndex
+from .gtf_io import open_gtf
+from .smorf_annotator import smORFAnnotator, parse_attributes
+from .gene_table import GeneTable
+
+# === Attribute appended to every shard record so results can be put back in input order ===
+RECORD_TAG = 'annotator_record'
+RECORD_TAG_RE = re.compile(rf' {RECORD_TAG} "\d+";')
+
+
+def annotate_shard(shard_args, shared_genes):
+    """
+    Runs intersect + classification for one shard in a worker process.
+
+    Returns (resolved, events, intergenic):
+      resolved   - (first record, gene_id, annotation, gene_name) for genes only found in this shard
+      events     - (record, gene_id, annotation, gene_name) per CDS line of genes spanning shards,
+                   which are resolved by the parent in input order
+      intergenic - (record, gene_id) for every non-intersecting record
+    """
+    if shard_args.engine == 'native':
+        runner = NativeIntersectRunner(args=shard_args)
+    else:
+        runner = BedtoolsRunner(args=shard_args)
+    intersect_lines, non_intersect_lines = runner.stream(keep_intermediates=shard_args.keep_intermediates)
+
+    annotator = smORFAnnotator(args=shard_args)
+    gene_data = GeneTable()
+    first_record = {}
+    events = []
+    for gene_id, annotation, gene_name, attrs in annotator.iter_annotations(intersect_lines):
+        record = int(attrs[RECORD_TAG])
+        if gene_id in shared_genes:
+            events.append((record, gene_id, annotation, gene_name))
+            continue
+        first_record.setdefault(gene_id, record)
+        gene_data.resolve(gene_id, annotation, gene_name)
+
+    resolved = [
+        (first_record[gene_id], gene_id, annotation, gene_name)
+        for gene_id, (annotation, gene_name) in gene_data.items()
+    ]
+
+    intergenic = []
+    for line in non_intersect_lines:
+        if not line.startswith('chr'):
+            continue
+        attrs = parse_attributes(line.strip().split('\t')[8])
+        intergenic.append((int(attrs[RECORD_TAG]), attrs.get('gene_id', 'Unknown')))
+
+    return resolved, events, intergenic
+
+
+class ShardedAnnotator(PipelineStructure):
+    """
+    Parallel smorf_types run: the smORF GTF is split by chromosome and strand, every shard
+    is intersected and classified in a process pool, and the per-gene results are merged
+    back in input order, so the output matches a single-process run.
+    """
+    def __init__(self, args):
+        super().__init__(args)
+        self.smorf_gtf = args.smorf_gtf
+        self.ensembl_gtf = args.ensembl_gtf
+        self.intersect_file = args.intersect_output
+        self.non_intersect_file = args.non_intersect_output
+        self.threads = args.threads
+
+    def run(self):
+        shard_dir = tempfile.mkdtemp(prefix='shards_', dir=self.outdir)
+        try:
+            shards, shared_genes = self.__split_smorf_gtf(shard_dir)
+            print(f"Split '{self.smorf_gtf}' into {len(shards)} chromosome/strand shards.")
+
+            if self.args.engine == 'native':
+                # Build or refresh the cached index once, so workers only memory-map it
+                GTFIntervalIndex.load_or_build(self.ensembl_gtf, self.args.index_dir)
+                ensembl_shards = {key: self.ensembl_gtf for key in shards}
+            else:
+                ensembl_shards = self.__split_ensembl_gtf(shard_dir, shards)
+
+            # Largest shards first so the pool is not left waiting on one big chromosome
+            order = sorted(shards, key=lambda key: os.path.getsize(shards[key]), reverse=True)
+            with concurrent.futures.ProcessPoolExecutor(max_workers=self.threads) as executor:
+                futures = [
+                    executor.submit(annotate_shard, self.__shard_args(shards[key], ensembl_shards[key]), shared_genes)
+                    for key in order
+                ]
+                results = [future.result() for future in futures]
+
+            gene_data = self.merge(results)
+            smORFAnnotator(args=self.args).write_annotations(gene_data)
+
+            if self.args.keep_intermediates:
+                self.__concatenate_intermediates([shards[key] for key in order])
+        finally:
+            shutil.rmtree(shard_dir, ignore_errors=True)
+
+    def __shard_args(self, smorf_shard, ensembl_shard):
+        shard_args = argparse.Namespace(**vars(self.args))
+        shard_args.smorf_gtf = smorf_shard
+        shard_args.ensembl_gtf = ensembl_shard
+        shard_args.intersect_output = f"{smorf_shard}.intersect"
+        shard_args.non_intersect_output = f"{smorf_shard}.nonintersect"
+        return shard_args
+
+    def __split_smorf_gtf(self, shard_dir):
+        """
+        Writes one GTF per (chromosome, strand), tagging every record with its line number.
+        Also returns the gene IDs whose records fall into more than one shard.
+        """
+        shards = {}
+        handles = {}
+        gene_shards = defaultdict(set)
+        try:
+            with open_gtf(self.smorf_gtf) as file:
+                for record, line in enumerate(file):
+                    if not line.strip() or line.startswith(('#', 'track', 'browser')):
+                        continue
+                    parts = line.rstrip('\r\n').split('\t')
+                    if len(parts) < 9:
+                        continue
+                    key = (parts[0], parts[6])
+                    if key not in handles:
+                        shards[key] = os.path.join(shard_dir, f"smorf_{len(shards)}.gtf")
+                        handles[key] = open(shards[key], 'w')
+                    gene_shards[parse_attributes(parts[8]).get('gene_id', 'Unknown')].add(key)
+                    parts[8] = f'{parts[8]} {RECORD_TAG} "{record}";'
+                    handles[key].write('\t'.join(parts) + '\n')
+        finally:
+            for handle in handles.values():
+                handle.close()
+
+        shared_genes = {gene_id for gene_id, keys in gene_shards.items() if len(keys) > 1}
+        return shards, shared_genes
+
+    def __split_ensembl_gtf(self, shard_dir, shards):
+        """
+        Splits the Ensembl GTF into the same (chromosome, strand) shards for the bedtools engine,
+        so every worker only reads its own part of the annotation.
+        """
+        ensembl_shards = {key: os.path.join(shard_dir, f"ensembl_{i}.gtf") for i, key in enumerate(shards)}
+        handles = {key: open(path, 'w') for key, path in ensembl_shards.items()}
+        try:
+            with open_gtf(self.ensembl_gtf) as file:
+                for line in file:
+                    parts = line.split('\t', 7)
+                    if len(parts) < 7:
+                        continue
+                    handle = handles.get((parts[0], parts[6]))
+                    if handle is not None:
+                        handle.write(line)
+        finally:
+            for handle in handles.values():
+                handle.close()
+        return ensembl_shards
+
+    @staticmethod
+    def merge(results):
+        """
+        Combines per-shard results into the gene_data a single-process run would produce:
+        genes ordered by their first intersecting CDS record, then intergenic genes by record.
+        """
+        records = []
+        events = []
+        intergenic = []
+        for shard_resolved, shard_events, shard_intergenic in results:
+            records.extend(shard_resolved)
+            events.extend(shard_events)
+            intergenic.extend(shard_intergenic)
+
+        # Genes spanning shards replay their lines in input order through the same rules
+        shared_data = GeneTable()
+        first_record = {}
+        for record, gene_id, annotation, gene_name in sorted(events, key=lambda event: event[0]):
+            first_record.setdefault(gene_id, record)
+            shared_data.resolve(gene_id, annotation, gene_name)
+        records.extend(
+            (first_record[gene_id], gene_id, annotation, gene_name)
+            for gene_id, (annotation, gene_name) in shared_data.items()
+        )
+
+        gene_data = GeneTable()
+        for _, gene_id, annotation, gene_name in sorted(records, key=lambda item: item[0]):
+            gene_data[gene_id] = (annotation, gene_name)
+
+        # === Add Intergenic Genes ===
+        for _, gene_id in sorted(intergenic):
+            if gene_id not in gene_data:
+                gene_data[gene_id] = ('Intergenic', 'Intergenic')
+
+        return gene_data
+
+    def __concatenate_intermediates(self, smorf_shards):
+        for suffix, output in (('intersect', self.intersect_file), ('nonintersect', self.non_intersect_file)):
+            with open(output, 'w') as outfile:
+                for smorf_shard in smorf_shards:
+                    with open(f"{smorf_shard}.{suffix}", 'r') as infile:
+                        for line in infile:
+                            outfile.write(RECORD_TAG_RE.sub('', line))
+        print(f"Intersect output file '{self.intersect_file}' created successfully.")
+        print(f"Non-intersect output file '{self.non_intersect_file}' created successfully.")
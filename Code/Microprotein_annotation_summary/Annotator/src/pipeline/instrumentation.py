@@ -0,0 +1,152 @@
+import os
+import sys
+import json
+import time
+import cProfile
+import platform
+import resource
+from contextlib import contextmanager
+
+# === Name of the JSON run report written to --outdir ===
+REPORT_FILE = 'run_report.json'
+PROFILE_DIR = 'profile'
+
+
+def rss_mb(usage):
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return round(usage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def cpu_seconds(usage):
+    return usage.ru_utime + usage.ru_stime
+
+
+class RunReport:
+    """
+    Collects per-stage measurements of a pipeline run and writes them as JSON to the
+    output directory.
+
+    Stages opened with stage() record wall and CPU time (of this process and of finished
+    child processes such as bedtools or shard workers) and the peak RSS reached so far.
+    Streams wrapped with track() record the lines and bytes passing through them and the
+    wall time spent producing them, which separates e.g. the intersect pass from the
+    classifier consuming it. With profile=True every stage is also run under cProfile
+    and dumped to <outdir>/profile/<stage>.pstats.
+    """
+    def __init__(self, args, profile=False):
+        self.args = args
+        self.path = os.path.join(args.outdir, REPORT_FILE)
+        self.profile_dir = os.path.join(args.outdir, PROFILE_DIR) if profile else None
+        self.stages = []
+        self.open_stages = []
+
+    def __enter__(self):
+        self.created = time.strftime('%Y-%m-%dT%H:%M:%S%z')
+        self.start_wall = time.perf_counter()
+        self.start_self = resource.getrusage(resource.RUSAGE_SELF)
+        self.start_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.write('failed' if exc_type else 'completed', error=repr(exc) if exc else None)
+        return False
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Measures the enclosed block. Yields the stage record, so callers can fill in
+        'lines' and 'bytes' for what the stage produced.
+        """
+        record = {'stage': name, 'parent': self.open_stages[-1] if self.open_stages else None,
+                  'lines': None, 'bytes': None}
+        self.stages.append(record)
+        self.open_stages.append(name)
+
+        profiler = cProfile.Profile() if self.profile_dir else None
+        start_wall = time.perf_counter()
+        start_self = resource.getrusage(resource.RUSAGE_SELF)
+        start_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield record
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                os.makedirs(self.profile_dir, exist_ok=True)
+                record['profile'] = os.path.join(self.profile_dir, f'{name}.pstats')
+                profiler.dump_stats(record['profile'])
+            wall = time.perf_counter() - start_wall
+            end_self = resource.getrusage(resource.RUSAGE_SELF)
+            end_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+            self.open_stages.pop()
+
+            # Time spent waiting on tracked streams is reported by those streams
+            nested = sum(stage['wall_seconds'] for stage in self.stages
+                         if stage['parent'] == name and 'tracked' in stage)
+            record.update(
+                wall_seconds=round(wall, 4),
+                self_wall_seconds=round(wall - nested, 4),
+                cpu_seconds=round(cpu_seconds(end_self) - cpu_seconds(start_self), 4),
+                children_cpu_seconds=round(cpu_seconds(end_children) - cpu_seconds(start_children), 4),
+                peak_rss_mb=rss_mb(end_self),
+                children_peak_rss_mb=rss_mb(end_children),
+            )
+
+    def track(self, name, lines):
+        """
+        Passes lines through unchanged while counting them and timing the producer.
+        Only wall time is recorded, as reading CPU clocks on every line is too costly;
+        'bytes' counts characters, which equals bytes for ASCII GTF lines.
+        """
+        record = {'stage': name, 'parent': self.open_stages[-1] if self.open_stages else None,
+                  'tracked': True, 'lines': 0, 'bytes': 0, 'wall_seconds': 0.0}
+        self.stages.append(record)
+        return self.__track(record, lines)
+
+    @staticmethod
+    def __track(record, lines):
+        iterator = iter(lines)
+        clock = time.perf_counter
+        wall = 0.0
+        count = 0
+        size = 0
+        try:
+            while True:
+                start = clock()
+                try:
+                    line = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    wall += clock() - start
+                count += 1
+                size += len(line)
+                yield line
+        finally:
+            record.update(lines=count, bytes=size, wall_seconds=round(wall, 4))
+
+    def write(self, status, error=None):
+        end_self = resource.getrusage(resource.RUSAGE_SELF)
+        end_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        paths = {name: value for name, value in vars(self.args).items()
+                 if isinstance(value, str) and os.path.isfile(value)}
+        report = {
+            'created': self.created,
+            'status': status,
+            'error': error,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'arguments': vars(self.args),
+            'wall_seconds': round(time.perf_counter() - self.start_wall, 4),
+            'cpu_seconds': round(cpu_seconds(end_self) - cpu_seconds(self.start_self), 4),
+            'children_cpu_seconds': round(cpu_seconds(end_children) - cpu_seconds(self.start_children), 4),
+            'peak_rss_mb': rss_mb(end_self),
+            'children_peak_rss_mb': rss_mb(end_children),
+            'files': {name: {'path': path, 'bytes': os.path.getsize(path)} for name, path in paths.items()},
+            'stages': self.stages,
+        }
+        os.makedirs(self.args.outdir, exist_ok=True)
+        with open(self.path, 'w') as out:
+            json.dump(report, out, indent=2, default=str)
+        print(f"[📊] Run report written to {self.path}")
@@ -1,6 +1,8 @@
 import os
 import shutil
-from ..annotation import BedtoolsRunner, smORFAnnotator
+import tempfile
+from .instrumentation import RunReport
+from ..annotation import BedtoolsRunner, NativeIntersectRunner, smORFAnnotator, GTFIntervalIndex, ShardedAnnotator, IncrementalAnnotator, RegionSelector
 
 class Pipeline:
     def __init__(self, args):
@@ -9,12 +11,63 @@ class Pipeline:
     
     def annotate(self):
         print("▶️ You have successfully initiated smORF annotation...")
-        run = BedtoolsRunner(args=self.args)
-        run.run_intersect()
-        run.run_non_intersect()
+        with RunReport(self.args, profile=self.args.profile) as report:
+            if not self.args.regions:
+                self.__annotate(self.args, report)
+                return
 
-        annotate = smORFAnnotator(args=self.args)
-        annotate.process_gtf_files()
+            # Restrict the run to the smORF records in --regions, read into a scratch directory
+            region_dir = tempfile.mkdtemp(prefix='regions_', dir=self.outdir)
+            try:
+                with report.stage('select_regions') as stage:
+                    region_args, stage['lines'] = RegionSelector(args=self.args).select(region_dir)
+                self.__annotate(region_args, report)
+            finally:
+                shutil.rmtree(region_dir, ignore_errors=True)
+
+    def __annotate(self, args, report):
+        if args.incremental:
+            with report.stage('incremental_annotation') as stage:
+                IncrementalAnnotator(args=args).run()
+                stage['bytes'] = os.path.getsize(args.output_file)
+            return
+
+        if args.threads > 1:
+            with report.stage('sharded_annotation') as stage:
+                ShardedAnnotator(args=args).run()
+                stage['bytes'] = os.path.getsize(args.output_file)
+            return
+
+        with report.stage('setup'):
+            if args.engine == 'native':
+                run = NativeIntersectRunner(args=args)
+            else:
+                run = BedtoolsRunner(args=args)
+
+            # Intersect output is piped into the classifier; files are only written on request
+            intersect_lines, non_intersect_lines = run.stream(keep_intermediates=args.keep_intermediates)
+            annotate = smORFAnnotator(args=args)
+
+        # The intersect and non-intersect passes run lazily inside the stages consuming them
+        with report.stage('classify') as stage:
+            gene_data = annotate.classify(report.track('intersect', intersect_lines))
+            stage['lines'] = len(gene_data)
+
+        with report.stage('intergenic') as stage:
+            annotate.add_intergenic(gene_data, report.track('non_intersect', non_intersect_lines))
+            stage['lines'] = len(gene_data)
+
+        with report.stage('write') as stage:
+            annotate.write_annotations(gene_data)
+            stage['lines'] = len(gene_data)
+            stage['bytes'] = os.path.getsize(args.output_file)
+
+    def build_index(self):
+        print("▶️ Building the Ensembl GTF index...")
+        with RunReport(self.args, profile=self.args.profile) as report:
+            with report.stage('index_build') as stage:
+                index = GTFIntervalIndex.load_or_build(self.args.ensembl_gtf, self.args.index_dir)
+                stage['lines'] = int(index.rows.size)
 
     # def __cleanup_output_directory(self, outdir):
     #     """Removes all directories and files in the specified output directory and recreates the directory."""
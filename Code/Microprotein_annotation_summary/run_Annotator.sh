@@ -19,4 +19,5 @@ python "${ANNOTATOR_SCRIPT}" smorf_types \
   --outdir "${OUTPUT_DIR}" \
   --intersect_output "${INTERSECT_OUT}" \
   --non_intersect_output "${NON_INTERSECT_OUT}" \
+  --keep_intermediates \
   --output_file "${OUTPUT_FILE}"
\ No newline at end of file
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+import argparse
+import concurrent.futures
+import numpy as np
+import pandas as pd
+from batch_discovery import discover_batches, DEFAULT_BATCH_GLOBS
+from fragpipe_reader import read_fragpipe_table, PROTEIN_COLUMNS, HAVE_PYARROW
+from protein_columns import REQUIRED_COLUMNS, COUNT_COLUMNS, join_pair_values
+from protein_aggregate_state import ProteinAggregateState, default_state_dir
+
+def read_protein_file(protein_file, engine="c", cache=False):
+    """
+    Read the required columns of one protein.tsv, or None if any is missing.
+    """
+    df = read_fragpipe_table(protein_file, PROTEIN_COLUMNS, engine=engine, cache=cache)
+    if not all(col in df.columns for col in REQUIRED_COLUMNS):
+        print(f"Missing required columns in file: {protein_file}")
+        return None
+    return df[REQUIRED_COLUMNS]
+
+def read_protein_files(protein_files, num_workers=4, engine="c", cache=False):
+    """
+    Read protein.tsv files in parallel; returns (file, DataFrame or None) in file order.
+    """
+    with concurrent.futures.ProcessPoolExecutor(max_workers=num_workers) as executor:
+        return list(zip(protein_files, executor.map(read_protein_file, protein_files,
+                                                    [engine] * len(protein_files), [cache] * len(protein_files))))
+
+def aggregate_proteins(combined_df):
+    """
+    Sum the spectral counts of each Protein and join its distinct Indistinguishable Proteins
+    values with ";" (in first-seen order), with NaN or empty values counted as "BLANK".
+    Proteins and values are factorized once, so the reductions run on integer codes.
+    """
+    combined_df = combined_df[combined_df['Protein'].notna()]
+    protein_codes, proteins = pd.factorize(combined_df['Protein'])
+    indistinguishable = combined_df['Indistinguishable Proteins'].fillna("BLANK").replace("", "BLANK")
+    value_codes, values = pd.factorize(indistinguishable)
+    proteins, values = np.asarray(proteins, dtype=object), np.asarray(values, dtype=object)
+
+    aggregated_df = combined_df[COUNT_COLUMNS].groupby(protein_codes).sum()
+
+    # Distinct (Protein, value) pairs in first-seen order
+    pairs = pd.unique(protein_codes.astype(np.int64) * len(values) + value_codes)
+    pair_proteins, pair_values = np.divmod(pairs, len(values))
+    protein_values = join_pair_values(len(proteins), pair_proteins, values[pair_values])
+
+    rows = aggregated_df.index.to_numpy()
+    aggregated_df.insert(0, 'Protein', proteins[rows])
+    aggregated_df['Indistinguishable Proteins'] = protein_values[rows]
+    return aggregated_df.sort_values('Protein').reset_index(drop=True)
+
+def aggregate_protein_ids(main_dir, output_csv, output_ids=None, batch_globs=DEFAULT_BATCH_GLOBS, manifest=None,
+                          num_workers=4, engine="c", cache=False, incremental=False, state_dir=None):
+    """
+    Read protein.tsv from every batch under main_dir (matched by batch_globs, or listed in a
+    manifest) in parallel, aggregate them per Protein into output_csv, and write the
+    Protein IDs to output_ids. With incremental, only batches not yet in the aggregate
+    state (state_dir) are read. Returns the aggregated DataFrame.
+    """
+    batches = discover_batches(main_dir, "protein.tsv", batch_globs=batch_globs, manifest=manifest)
+    protein_files = [batch.path for batch in batches]
+
+    if incremental:
+        aggregated_df = ProteinAggregateState(state_dir or default_state_dir(output_csv)).update(
+            protein_files, lambda files: read_protein_files(files, num_workers, engine, cache))
+    else:
+        # Results come back in batch order, so the combined table is the same as a serial read
+        combined_data = [df for _, df in read_protein_files(protein_files, num_workers, engine, cache) if df is not None]
+        aggregated_df = aggregate_proteins(pd.concat(combined_data, ignore_index=True)) if combined_data else None
+
+    if aggregated_df is None or aggregated_df.empty:
+        print("No data found across the directories.")
+        return pd.DataFrame()
+
+    aggregated_df.to_csv(output_csv, index=False)
+    if output_ids:
+        aggregated_df['Protein'].to_csv(output_ids, index=False)
+    print(f"Aggregated data saved to {output_csv}")
+    return aggregated_df
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate FragPipe protein identifications across TMT batches and rounds.")
+    parser.add_argument("main_dir", help="Main directory containing the batch subdirectories (b1, b2, ..., round2/b1, ...)")
+    parser.add_argument("output_csv", help="Output CSV of summed spectral counts and indistinguishable proteins per Protein")
+    parser.add_argument("--output_ids", help="Also write the Protein IDs to this file")
+    parser.add_argument("--manifest", help="TSV (path, round columns) or YAML manifest of batch directories, instead of --batch_glob")
+    parser.add_argument("--batch_glob", nargs="+", default=DEFAULT_BATCH_GLOBS,
+                        help="Batch directories relative to main_dir as [round=]glob (default: b# and round2/b# results directories, where # matches digits)")
+    parser.add_argument("--workers", type=int, default=4, help="Number of parallel readers (default: 4)")
+    parser.add_argument("--engine", choices=["c", "pyarrow"], default="c", help="CSV parser for protein.tsv (default: c)")
+    parser.add_argument("--cache", action="store_true", help="Keep a Parquet copy of the columns read next to each protein.tsv, reused until it changes")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only read batches added since the last --incremental run, updating the stored aggregate")
+    parser.add_argument("--state", help="Directory of the incremental aggregate state (default: <output_csv without extension>_state)")
+    args = parser.parse_args()
+    if (args.engine == "pyarrow" or args.cache) and not HAVE_PYARROW:
+        print("pyarrow is not installed; using the C parser without a Parquet cache")
+
+    aggregate_protein_ids(args.main_dir, args.output_csv, output_ids=args.output_ids, batch_globs=args.batch_glob,
+                          manifest=args.manifest, num_workers=args.workers, engine=args.engine, cache=args.cache,
+                          incremental=args.incremental, state_dir=args.state)
+
+if __name__ == '__main__':
+    main()
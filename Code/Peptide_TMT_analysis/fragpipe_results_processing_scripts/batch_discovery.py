@@ -0,0 +1,122 @@
+import os
+import re
+import fnmatch
+import concurrent.futures
+from collections import namedtuple
+import pandas as pd
+
+# Batch directories of the TMT rounds relative to the main directory, as "round=glob".
+# Besides the shell wildcards, "#" matches a run of digits, so b# is b1, b2, ... but not b1_old
+DEFAULT_BATCH_GLOBS = [
+    "round1=b#/shortstop_proteogenomics_appended_results_cpm05/DDA",
+    "round2=round2/b#/shortstop_proteogenomics_appended_results_cpm05/DDA",
+]
+
+# Threads for the directory scans and file checks, which mostly wait on the filesystem
+DISCOVERY_THREADS = 16
+
+Batch = namedtuple("Batch", ["round", "name", "path"])
+
+def natural_key(name):
+    """
+    Sort key that orders b2 before b10.
+    """
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", name)]
+
+def parse_batch_glob(spec, default_round):
+    """
+    Splits "round=glob" into (round, glob); a bare glob gets default_round.
+    """
+    round_name, sep, pattern = spec.partition("=")
+    return (round_name, pattern) if sep else (default_round, spec)
+
+def _component_regex(component):
+    """
+    Compiled regex for one glob component, with "#" matching one or more digits.
+    """
+    return re.compile(fnmatch.translate(component).replace(r"\#", r"\d+"))
+
+def _matching_dirs(directory, pattern):
+    """
+    Subdirectories of directory whose name matches pattern, read with a single scandir.
+    """
+    regex = _component_regex(pattern)
+    try:
+        with os.scandir(directory) as entries:
+            names = [entry.name for entry in entries if entry.is_dir() and regex.match(entry.name)]
+    except OSError:
+        return []
+    return [os.path.join(directory, name) for name in sorted(names, key=natural_key)]
+
+def _expand_glob(executor, main_dir, pattern):
+    """
+    Batch directories matching pattern under main_dir. Wildcard components are scanned for
+    every candidate directory in parallel; literal components are joined without a stat.
+    """
+    directories = [main_dir]
+    for component in pattern.strip("/").split("/"):
+        if re.search(r"[*?[#]", component):
+            directories = [path for paths in executor.map(_matching_dirs, directories, [component] * len(directories)) for path in paths]
+        else:
+            directories = [os.path.join(directory, component) for directory in directories]
+    return directories
+
+def read_manifest(manifest, main_dir):
+    """
+    Reads a manifest of batches as [(round, path)]. A TSV needs a 'path' column and may
+    have a 'round' column; a YAML file (needs PyYAML) is either a list of {path, round}
+    entries or a mapping of round to a list of paths. Relative paths are taken from
+    main_dir, and a path may be a batch directory or the file itself.
+    """
+    if manifest.endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError(f"Reading the YAML manifest {manifest} needs PyYAML; use a TSV manifest instead")
+        with open(manifest, "r") as f:
+            content = yaml.safe_load(f) or []
+        if isinstance(content, dict):
+            entries = [(str(round_name), str(path)) for round_name, paths in content.items() for path in paths]
+        else:
+            entries = [(str(entry.get("round", "manifest")), str(entry["path"])) for entry in content]
+    else:
+        table = pd.read_csv(manifest, sep="\t", dtype=str, comment="#")
+        if "path" not in table.columns:
+            raise ValueError(f"Manifest {manifest} has no 'path' column")
+        table = table.dropna(subset=["path"])
+        rounds = table["round"].fillna("manifest") if "round" in table.columns else ["manifest"] * len(table)
+        entries = list(zip(rounds, table["path"]))
+    return [(round_name, os.path.join(main_dir, path)) for round_name, path in entries]
+
+def _locate(path, filename):
+    """
+    (path of filename, whether it exists) for a batch path that is either a directory or
+    the file itself.
+    """
+    if os.path.basename(path) != filename and not os.path.isfile(path):
+        path = os.path.join(path, filename)
+    return path, os.path.isfile(path)
+
+def discover_batches(main_dir, filename, batch_globs=DEFAULT_BATCH_GLOBS, manifest=None):
+    """
+    Finds filename (e.g. peptide.tsv) in every batch of main_dir, listed by a manifest or
+    matched by the batch globs, in one parallel sweep. Returns a list of Batch(round, name,
+    path) in manifest or glob order, with batch directories in natural order.
+    """
+    with concurrent.futures.ThreadPoolExecutor(max_workers=DISCOVERY_THREADS) as executor:
+        if manifest:
+            candidates = read_manifest(manifest, main_dir)
+        else:
+            candidates = []
+            for i, spec in enumerate(batch_globs, start=1):
+                round_name, pattern = parse_batch_glob(spec, f"glob{i}")
+                candidates.extend((round_name, directory) for directory in _expand_glob(executor, main_dir, pattern))
+        located = list(executor.map(_locate, [path for _, path in candidates], [filename] * len(candidates)))
+
+    batches = []
+    for (round_name, _), (path, exists) in zip(candidates, located):
+        if not exists:
+            print(f"File not found: {path}")
+            continue
+        batches.append(Batch(round_name, os.path.relpath(os.path.dirname(path), main_dir), path))
+    return batches
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Compares the regex alternation previously used by process_peptide_file with the
+GeneIDMatcher automaton (forced on for every ID count) as the number of gene IDs grows,
+on synthetic Protein strings.
+
+    python benchmarks/bench_gene_id_matcher.py --id_counts 100 1000 10000 100000
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gene_id_matcher import GeneIDMatcher
+
+def make_gene_ids(count, rng):
+    return [f"chr{rng.randint(1, 22)}:{rng.randint(1, 10**8)}-{rng.randint(1, 10**8)}:{rng.choice('+-')}"
+            for _ in range(count)]
+
+def make_proteins(count, gene_ids, rng, matched_fraction=0.3):
+    proteins = []
+    for _ in range(count):
+        if rng.random() < matched_fraction:
+            proteins.append(rng.choice(gene_ids))
+        else:
+            proteins.append(f"ENSP{rng.randint(0, 10**11):011d}")
+    return pd.Series(proteins)
+
+def run_regex(gene_ids, proteins):
+    pattern = '|'.join(re.escape(g) for g in gene_ids)
+    matched = proteins[proteins.str.contains(pattern, na=False)]
+    return [sorted(set(re.findall(pattern, protein))) for protein in matched]
+
+def run_matcher(matcher, proteins):
+    matched = proteins[matcher.contains(proteins)]
+    return [sorted(set(matcher.findall(protein))) for protein in matched]
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark gene-ID matching in Protein strings")
+    parser.add_argument("--id_counts", type=int, nargs='+', default=[100, 1000, 10000, 100000], help="Numbers of gene IDs to match")
+    parser.add_argument("--proteins", type=int, default=50000, help="Number of Protein strings")
+    parser.add_argument("--regex_max_ids", type=int, default=100000, help="Skip the regex above this many IDs")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed")
+    args = parser.parse_args()
+
+    results = []
+    for count in args.id_counts:
+        rng = random.Random(args.seed)
+        gene_ids = make_gene_ids(count, rng)
+        proteins = make_proteins(args.proteins, gene_ids, rng)
+
+        # The automaton is built once per run and reused for every file
+        build_seconds, matcher = timed(GeneIDMatcher, gene_ids, 0)
+        matcher_seconds, matcher_result = timed(run_matcher, matcher, proteins)
+        row = {"gene_ids": count, "proteins": args.proteins,
+               "matcher_build_seconds": round(build_seconds, 4), "matcher_seconds": round(matcher_seconds, 4)}
+        if count <= args.regex_max_ids:
+            regex_seconds, regex_result = timed(run_regex, gene_ids, proteins)
+            row.update(regex_seconds=round(regex_seconds, 4),
+                       speedup=round(regex_seconds / matcher_seconds, 2),
+                       identical=regex_result == matcher_result)
+        results.append(row)
+        print(json.dumps(row))
+
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -1,19 +1,39 @@
 #!/usr/bin/env python3
-import os
-import re
-import sys
 import argparse
+import numpy as np
 import pandas as pd
 import concurrent.futures
+from gene_id_matcher import GeneIDMatcher
+from batch_discovery import discover_batches, DEFAULT_BATCH_GLOBS
+from fragpipe_reader import read_fragpipe_table, PEPTIDE_COLUMNS, PIPE_COLUMN, HAVE_PYARROW
+from tryptic_index import TrypticIndex
+from match_writer import DeduplicatingWriter
 
-def process_peptide_file(peptide_file, gene_ids):
+# Columns of the gene_id-peptide table returned for each peptide file
+OUTPUT_COLUMNS = ["gene_id", "tryptic_peptide", "tryptic_peptide_start", "tryptic_peptide_end"]
+
+# GeneIDMatcher of a pool worker, set once per process by init_worker
+_worker_matcher = None
+
+def init_worker(matcher):
+    """
+    Pool initializer: keeps the matcher for every task of this worker, so tasks only send
+    a file path. Forked workers inherit it; spawned workers rebuild it once from the IDs.
     """
-    Process a single peptide file and return a list of dicts with gene_id and peptide.
-    Uses a combined regex for efficiency.
+    global _worker_matcher
+    _worker_matcher = matcher
+
+def process_peptide_file(peptide_file, gene_ids=None, engine="c", cache=False):
+    """
+    Process a single peptide file and return a DataFrame of gene_id-peptide matches.
+    gene_ids is a list of IDs or a prebuilt GeneIDMatcher, which finds them in one pass
+    over each Protein string however many IDs there are; in a pool worker it defaults to
+    the matcher set by init_worker. engine and cache are passed to read_fragpipe_table.
     """
-    results = []
+    results = pd.DataFrame(columns=OUTPUT_COLUMNS)
     try:
-        df = pd.read_csv(peptide_file, sep="\t", dtype=str)
+        # Only the columns used below, plus whether each row has a "|" in any column
+        df = read_fragpipe_table(peptide_file, PEPTIDE_COLUMNS, flag_pipes=True, engine=engine, cache=cache)
     except Exception as e:
         print(f"Error reading {peptide_file}: {e}")
         return results
@@ -24,101 +44,121 @@ def process_peptide_file(peptide_file, gene_ids):
         return results
 
     # Exclude rows that contain "|" in any column
-    mask_no_pipe = ~df.apply(lambda row: row.astype(str).str.contains("\|").any(), axis=1)
-    df = df[mask_no_pipe]
+    df = df[~df[PIPE_COLUMN].to_numpy()]
 
     if df.empty:
         return results
 
-    # Build a regex pattern that matches any gene id.
-    # Using re.escape ensures that special characters in gene ids are handled properly.
-    pattern = '|'.join(re.escape(g) for g in gene_ids)
-
-    # Filter rows where Protein contains any of the gene ids (vectorized)
-    matched_df = df[df["Protein"].str.contains(pattern, na=False)]
-    if matched_df.empty:
+    # Aho-Corasick automaton over the gene ids (same matches as a regex alternation of them)
+    if gene_ids is None:
+        matcher = _worker_matcher
+    else:
+        matcher = gene_ids if isinstance(gene_ids, GeneIDMatcher) else GeneIDMatcher(gene_ids)
+
+    # Match each distinct Protein once; duplicate gene ids within a Protein are kept once
+    codes, proteins = pd.factorize(df["Protein"])
+    protein_genes = [list(dict.fromkeys(matcher.findall(protein))) for protein in proteins]
+    # Trailing 0 is picked by the -1 code of missing Proteins
+    counts = np.array([len(genes) for genes in protein_genes] + [0])[codes]
+    if not counts.any():
         return results
 
-    # For each row, use re.findall to determine which gene ids match.
-    for _, row in matched_df.iterrows():
-        protein_str = row["Protein"]
-        peptide = row["Peptide"]
-        peptide_start = row["Start"]
-        peptide_end = row["End"]
-        matching_genes = re.findall(pattern, protein_str)
-        # Remove duplicate gene ids (if multiple matches)
-        matching_genes = list(set(matching_genes))
-        for gene in matching_genes:
-            results.append({"gene_id": gene, "tryptic_peptide": peptide, "tryptic_peptide_start": peptide_start, "tryptic_peptide_end": peptide_end})
-    return results
-
-def find_unique_microprotein_peptides_bulk(gene_ids_file, main_dir, output_csv, num_workers=4):
+    # Explode: one output row per (peptide row, matching gene id)
+    offsets = np.cumsum([0] + [len(genes) for genes in protein_genes])[codes]
+    rows = np.repeat(np.arange(len(df)), counts)
+    within = np.arange(len(rows)) - np.repeat(np.cumsum(counts) - counts, counts)
+    flat_genes = np.array([gene for genes in protein_genes for gene in genes], dtype=object)
+
+    return pd.DataFrame({
+        "gene_id": flat_genes[np.repeat(offsets, counts) + within],
+        "tryptic_peptide": df["Peptide"].to_numpy()[rows],
+        "tryptic_peptide_start": df["Start"].to_numpy()[rows],
+        "tryptic_peptide_end": df["End"].to_numpy()[rows],
+    })
+
+def find_unique_microprotein_peptides_bulk(gene_ids_file, main_dir, output_csv, num_workers=4, manifest=None, batch_globs=DEFAULT_BATCH_GLOBS,
+                                           engine="c", cache=False, database=None, missed_cleavages=2):
     """
-    Process directories b1 to b50 under main_dir, search peptide.tsv files,
-    and save gene_id-peptide matches into output_csv using parallel processing.
+    Process the batch directories under main_dir (matched by batch_globs, or listed in a
+    TSV/YAML manifest), search peptide.tsv files, and save gene_id-peptide matches into
+    output_csv using parallel processing. Matches are de-duplicated and written as each
+    file completes; a .parquet output_csv is written as Parquet row groups (needs pyarrow).
+    With a database (FASTA or CSV with a sequence column), each peptide is also checked for
+    uniqueness against its tryptic digest. Returns the number of matches written.
     """
+    if output_csv.endswith(".parquet") and not HAVE_PYARROW:
+        print(f"Writing {output_csv} as Parquet needs pyarrow; use a .csv output instead")
+        return 0
+
     # Read gene IDs (one per line)
     try:
         with open(gene_ids_file, 'r') as f:
             gene_ids = [line.strip() for line in f if line.strip()]
     except Exception as e:
         print(f"Error reading gene IDs from {gene_ids_file}: {e}")
-        return pd.DataFrame()
+        return 0
 
     print(f"Gene IDs: {gene_ids}")
-    all_results = []
-    peptide_files = []
-
-    # Build list of peptide.tsv file paths from subdirectories b1 to b50
-    for i in range(1, 51):
-        sub_dir = os.path.join(main_dir, f"b{i}", "shortstop_proteogenomics_appended_results_cpm05", "DDA")
-        peptide_file = os.path.join(sub_dir, "peptide.tsv")
-        if os.path.exists(peptide_file):
-            peptide_files.append(peptide_file)
-        else:
-            print(f"File not found: {peptide_file}")
-
-    for i in range(1, 14):
-        sub_dir = os.path.join(main_dir, f"round2/b{i}", "shortstop_proteogenomics_appended_results_cpm05", "DDA")
-        peptide_file = os.path.join(sub_dir, "peptide.tsv")
-        if os.path.exists(peptide_file):
-            peptide_files.append(peptide_file)
-        else:
-            print(f"File not found: {peptide_file}")
-
-    # Process files in parallel using ProcessPoolExecutor
-    with concurrent.futures.ProcessPoolExecutor(max_workers=num_workers) as executor:
-        # Submit a future for each peptide file
-        future_to_file = {executor.submit(process_peptide_file, pf, gene_ids): pf for pf in peptide_files}
+    # Built once here and handed to each worker once, instead of with every task
+    matcher = GeneIDMatcher(gene_ids)
+
+    # Find peptide.tsv in every batch directory (b1, b2, ... and round2/b1, ... by default)
+    try:
+        batches = discover_batches(main_dir, "peptide.tsv", batch_globs=batch_globs, manifest=manifest)
+    except Exception as e:
+        print(f"Error discovering batches under {main_dir}: {e}")
+        return 0
+    peptide_files = [batch.path for batch in batches]
+
+    # One indexed lookup per file's matches against every protein of the search database
+    index = TrypticIndex.from_file(database, missed_cleavages=missed_cleavages) if database else None
+
+    # Process files in parallel using ProcessPoolExecutor, writing matches as each file completes
+    with concurrent.futures.ProcessPoolExecutor(max_workers=num_workers, initializer=init_worker, initargs=(matcher,)) as executor, \
+            DeduplicatingWriter(output_csv, OUTPUT_COLUMNS) as writer:
+        # Submit a future for each peptide file; workers return DataFrames
+        future_to_file = {executor.submit(process_peptide_file, pf, engine=engine, cache=cache): pf for pf in peptide_files}
         for future in concurrent.futures.as_completed(future_to_file):
-            pf = future_to_file[future]
+            # Drop the future so its results are freed once written
+            pf = future_to_file.pop(future)
             try:
                 results = future.result()
-                print(f"Found {len(results)} matches in {pf}")
-                all_results.extend(results)
             except Exception as e:
                 print(f"Error processing {pf}: {e}")
-
-    if all_results:
-        out_df = pd.DataFrame(all_results)
-        out_df.drop_duplicates(inplace=True)
-        out_df.to_csv(output_csv, index=False)
-        print(f"Finished! Results saved in {output_csv}")
-        return out_df
+                continue
+            # Outside the try, so a failing write stops the run instead of silently dropping the file's matches
+            print(f"Found {len(results)} matches in {pf}")
+            if index is not None and not results.empty:
+                results["database_protein_count"] = index.protein_counts(results["tryptic_peptide"])
+                results["unique_in_database"] = results["database_protein_count"] == 1
+            writer.write(results)
+
+    if writer.rows:
+        print(f"Finished! {writer.rows} unique matches saved in {output_csv}")
     else:
         print("No matches found.")
-        return pd.DataFrame()
+    return writer.rows
 
 def main():
     parser = argparse.ArgumentParser(description="Find unique microprotein peptides with parallel processing.")
     parser.add_argument("gene_ids_file", help="File with gene IDs (one per line)")
-    parser.add_argument("main_dir", help="Main directory containing subdirectories b1 to b50")
-    parser.add_argument("output_csv", help="Output CSV file to save results")
+    parser.add_argument("main_dir", help="Main directory containing the batch subdirectories (b1, b2, ..., round2/b1, ...)")
+    parser.add_argument("output_csv", help="Output CSV file to save results (or .parquet, with pyarrow)")
     parser.add_argument("--workers", type=int, default=4, help="Number of parallel workers (default: 4)")
+    parser.add_argument("--manifest", help="TSV (path, round columns) or YAML manifest of batch directories, instead of --batch_glob")
+    parser.add_argument("--batch_glob", nargs="+", default=DEFAULT_BATCH_GLOBS,
+                        help="Batch directories relative to main_dir as [round=]glob (default: b# and round2/b# results directories, where # matches digits)")
+    parser.add_argument("--engine", choices=["c", "pyarrow"], default="c", help="CSV parser for peptide.tsv (default: c)")
+    parser.add_argument("--cache", action="store_true", help="Keep a Parquet copy of the columns read next to each peptide.tsv, reused until it changes")
+    parser.add_argument("--database", help="FASTA or CSV with a sequence column (e.g. microprotein_master.csv) to check peptide uniqueness against")
+    parser.add_argument("--missed_cleavages", type=int, default=2, help="Missed cleavages of the --database digest (default: 2)")
     args = parser.parse_args()
+    if (args.engine == "pyarrow" or args.cache) and not HAVE_PYARROW:
+        print("pyarrow is not installed; using the C parser without a Parquet cache")
 
-    df_out = find_unique_microprotein_peptides_bulk(args.gene_ids_file, args.main_dir, args.output_csv, num_workers=args.workers)
-    print(df_out.head())
+    find_unique_microprotein_peptides_bulk(args.gene_ids_file, args.main_dir, args.output_csv, num_workers=args.workers,
+                                           manifest=args.manifest, batch_globs=args.batch_glob, engine=args.engine, cache=args.cache,
+                                           database=args.database, missed_cleavages=args.missed_cleavages)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,112 @@
+import os
+import json
+import importlib.util
+import numpy as np
+import pandas as pd
+
+# Columns used from FragPipe's peptide.tsv and protein.tsv, with the dtypes they are read as
+PEPTIDE_COLUMNS = {"Peptide": str, "Start": str, "End": str, "Protein": "category"}
+PROTEIN_COLUMNS = {
+    "Protein": str,
+    "Unique Spectral Count": "Int64",
+    "Razor Spectral Count": "Int64",
+    "Indistinguishable Proteins": str,
+}
+
+# Added by flag_pipes: whether the row has a "|" in any column, including the columns not read
+PIPE_COLUMN = "has_pipe"
+
+# The pyarrow CSV engine and the Parquet cache are used only when pyarrow is installed
+HAVE_PYARROW = importlib.util.find_spec("pyarrow") is not None
+CACHE_KEY = b"fragpipe_reader"
+
+def _header(path):
+    with open(path, "r") as f:
+        for line in f:
+            if line.strip("\r\n"):
+                return line.rstrip("\r\n").split("\t")
+    return []
+
+def _pipe_rows(path):
+    """
+    Whether each data row of a tab-separated file contains "|", found on the raw bytes:
+    one pass over the buffer instead of a string check per row and column. Blank lines
+    are skipped and the first non-blank line is the header, as read_csv does.
+    """
+    with open(path, "rb") as f:
+        buf = np.frombuffer(f.read(), dtype=np.uint8)
+    ends = np.flatnonzero(buf == ord("\n"))
+    if len(buf) and buf[-1] != ord("\n"):
+        ends = np.append(ends, len(buf))
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    lengths = ends - starts
+    # A line holding only "\r" is blank too
+    carriage = np.zeros(len(ends), dtype=bool)
+    carriage[lengths > 0] = buf[ends[lengths > 0] - 1] == ord("\r")
+    nonblank = np.flatnonzero(lengths - carriage > 0)
+
+    has_pipe = np.zeros(len(ends), dtype=bool)
+    has_pipe[np.searchsorted(ends, np.flatnonzero(buf == ord("|")))] = True
+    return has_pipe[nonblank[1:]]
+
+def _cache_key(path, columns, flag_pipes):
+    stat = os.stat(path)
+    return json.dumps({"mtime_ns": stat.st_mtime_ns, "size": stat.st_size,
+                       "columns": sorted(columns), "flag_pipes": flag_pipes}).encode()
+
+def _read_cache(cache_path, key):
+    import pyarrow.parquet as pq
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        if (pq.read_schema(cache_path).metadata or {}).get(CACHE_KEY) != key:
+            return None
+        return pd.read_parquet(cache_path)
+    except Exception:
+        return None
+
+def _write_cache(df, cache_path, key):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), CACHE_KEY: key})
+    tmp_path = f"{cache_path}.tmp"
+    try:
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"Could not write cache {cache_path}: {e}")
+
+def read_fragpipe_table(path, columns, flag_pipes=False, engine="c", cache=False):
+    """
+    Reads the columns of a FragPipe TSV given as {name: dtype}; requested columns that are
+    missing from the file are left out, so callers check for the ones they need.
+
+    flag_pipes adds PIPE_COLUMN. engine="pyarrow" uses the pyarrow CSV parser, and cache keeps
+    a Parquet copy of the result next to the TSV (<path>.parquet), reused while the TSV's
+    mtime and size are unchanged. Both fall back to the C parser without pyarrow.
+    """
+    cache = cache and HAVE_PYARROW
+    if cache:
+        cache_path = f"{path}.parquet"
+        key = _cache_key(path, columns, flag_pipes)
+        df = _read_cache(cache_path, key)
+        if df is not None:
+            return df
+
+    header = _header(path)
+    usecols = [column for column in header if column in columns]
+    df = pd.read_csv(path, sep="\t", usecols=usecols, dtype={column: columns[column] for column in usecols},
+                     engine="pyarrow" if engine == "pyarrow" and HAVE_PYARROW else "c")
+
+    if flag_pipes:
+        has_pipe = _pipe_rows(path)
+        if len(has_pipe) != len(df):
+            # Quoted fields spanning lines: check every column of the full table instead
+            full = pd.read_csv(path, sep="\t", dtype=str)
+            has_pipe = full.apply(lambda column: column.str.contains("|", regex=False, na=False)).any(axis=1).to_numpy()
+        df[PIPE_COLUMN] = has_pipe
+
+    if cache:
+        _write_cache(df, cache_path, key)
+    return df
@@ -0,0 +1,112 @@
+import re
+from collections import deque
+import numpy as np
+import pandas as pd
+
+# === Below this many IDs a compiled regex alternation is faster than the Python automaton ===
+REGEX_MAX_IDS = 1000
+
+class GeneIDMatcher:
+    """
+    Aho-Corasick automaton over a list of gene IDs.
+
+    Matching a string costs one pass over its characters, however many IDs there are.
+    findall() returns what re.findall('|'.join(map(re.escape, gene_ids)), text) returns:
+    leftmost, non-overlapping matches where, at a given position, the ID listed first wins.
+    Short ID lists (up to regex_max_ids) use that regex directly.
+    """
+    def __init__(self, gene_ids, regex_max_ids=REGEX_MAX_IDS):
+        self.gene_ids = list(dict.fromkeys(g for g in gene_ids if g))
+        self.regex_max_ids = regex_max_ids
+        self.pattern = None
+        if len(self.gene_ids) <= regex_max_ids:
+            self.pattern = re.compile('|'.join(re.escape(g) for g in self.gene_ids)) if self.gene_ids else None
+            self.goto = None
+        else:
+            self.__build()
+
+    def __reduce__(self):
+        # Rebuilding from the IDs is faster than unpickling millions of trie dicts
+        return self.__class__, (self.gene_ids, self.regex_max_ids)
+
+    def __build(self):
+        # Trie: one dict of child states per state; outputs are the IDs ending at a state
+        self.goto = [{}]
+        self.outputs = [[]]
+        for index, gene_id in enumerate(self.gene_ids):
+            state = 0
+            for char in gene_id:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.outputs.append([])
+                state = next_state
+            self.outputs[state].append(index)
+
+        # Failure links in breadth-first order, inheriting the outputs of the fallback state
+        self.fail = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.outputs[next_state] = self.outputs[next_state] + self.outputs[self.fail[next_state]]
+
+    def __iter_matches(self, text):
+        """
+        Yields (start, ID index) for every occurrence of every ID in text.
+        """
+        goto, fail, outputs, gene_ids = self.goto, self.fail, self.outputs, self.gene_ids
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for index in outputs[state]:
+                yield position - len(gene_ids[index]) + 1, index
+
+    def search(self, text):
+        """
+        True if any gene ID occurs in text.
+        """
+        if self.goto is None:
+            return self.pattern is not None and self.pattern.search(text) is not None
+        for _ in self.__iter_matches(text):
+            return True
+        return False
+
+    def findall(self, text):
+        """
+        Gene IDs found in text, with the same semantics as re.findall over the alternation.
+        """
+        if self.goto is None:
+            return self.pattern.findall(text) if self.pattern is not None else []
+        first = {}
+        for start, index in self.__iter_matches(text):
+            if index < first.get(start, len(self.gene_ids)):
+                first[start] = index
+
+        matches = []
+        end = 0
+        for start in sorted(first):
+            if start >= end:
+                gene_id = self.gene_ids[first[start]]
+                matches.append(gene_id)
+                end = start + len(gene_id)
+        return matches
+
+    def contains(self, series):
+        """
+        Vectorised equivalent of series.str.contains(pattern, na=False), matching every
+        distinct value once.
+        """
+        codes, uniques = pd.factorize(series)
+        # Trailing False is picked by the -1 code of missing values
+        found = np.array([self.search(value) for value in uniques] + [False], dtype=bool)
+        return pd.Series(found[codes], index=series.index)
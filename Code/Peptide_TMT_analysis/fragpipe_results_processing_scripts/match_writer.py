@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+from fragpipe_reader import HAVE_PYARROW
+
+class DeduplicatingWriter:
+    """
+    Writes DataFrame chunks as they arrive, to a CSV or, for a .parquet path, as Parquet row
+    groups (needs pyarrow), skipping rows whose key_columns were already written.
+
+    Rows are compared by a 64-bit hash of their key columns, kept in one sorted array, so
+    memory grows by 8 bytes per distinct row written rather than with the volume of results.
+    """
+    def __init__(self, path, key_columns):
+        self.path = path
+        self.key_columns = key_columns
+        self.parquet = path.endswith(".parquet")
+        if self.parquet and not HAVE_PYARROW:
+            raise ImportError(f"Writing {path} as Parquet needs pyarrow; use a .csv output instead")
+        self.seen = np.empty(0, dtype=np.uint64)
+        self.rows = 0
+        self.schema = None
+        self.parquet_writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __new_rows(self, hashes):
+        if not len(self.seen):
+            return np.ones(len(hashes), dtype=bool)
+        positions = np.searchsorted(self.seen, hashes)
+        return self.seen[np.minimum(positions, len(self.seen) - 1)] != hashes
+
+    def write(self, df):
+        """
+        Append the rows of df not written before; returns how many were written.
+        """
+        if df.empty:
+            return 0
+        hashes = pd.util.hash_pandas_object(df[self.key_columns], index=False).to_numpy()
+        # First occurrence of each key within the chunk, in chunk order
+        hashes, first = np.unique(hashes, return_index=True)
+        order = np.argsort(first)
+        hashes, first = hashes[order], first[order]
+        new = self.__new_rows(hashes)
+        if not new.any():
+            return 0
+        df = df.iloc[first[new]]
+        self.seen = np.union1d(self.seen, hashes[new])
+
+        if self.parquet:
+            self.__write_row_group(df)
+        else:
+            df.to_csv(self.path, mode="w" if self.rows == 0 else "a", header=self.rows == 0, index=False)
+        self.rows += len(df)
+        return len(df)
+
+    def __write_row_group(self, df):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        if self.parquet_writer is None:
+            # Columns that are all missing in the first chunk are typed as strings, not null
+            fields = pa.Schema.from_pandas(df, preserve_index=False)
+            self.schema = pa.schema([pa.field(field.name, pa.string()) if pa.types.is_null(field.type) else field for field in fields])
+            self.parquet_writer = pq.ParquetWriter(self.path, self.schema)
+        self.parquet_writer.write_table(pa.Table.from_pandas(df, schema=self.schema, preserve_index=False))
+
+    def close(self):
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+            self.parquet_writer = None
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+import re
+import gzip
+import argparse
+import numpy as np
+import pandas as pd
+
+ATTR_RE = re.compile(r'(\S+) "([^"]+)"')
+
+# smORF IDs that are their own coordinates (chrom:start-end:strand, 1-based), e.g. ShortStop protein IDs
+COORDINATE_RE = re.compile(r'^([^:]+):(\d+)-(\d+):([+-])$')
+
+BED12_COLUMNS = ["chrom", "chromStart", "chromEnd", "name", "score", "strand",
+                 "thickStart", "thickEnd", "itemRgb", "blockCount", "blockSizes", "blockStarts"]
+
+def read_cds_blocks(gtf_path, id_attribute="gene_id"):
+    """
+    CDS blocks of a smORF GTF as {(id, transcript_id): (chrom, strand, [(start, end), ...])}
+    with 0-based half-open blocks in genomic order.
+    """
+    transcripts = {}
+    with (gzip.open(gtf_path, "rt") if gtf_path.endswith(".gz") else open(gtf_path, "r")) as f:
+        for line in f:
+            if line.startswith("#"):
+                continue
+            parts = line.rstrip("\n").split("\t")
+            if len(parts) < 9 or parts[2] != "CDS":
+                continue
+            attrs = dict(ATTR_RE.findall(parts[8]))
+            key = (attrs.get(id_attribute, "Unknown"), attrs.get("transcript_id", ""))
+            transcripts.setdefault(key, (parts[0], parts[6], []))[2].append((int(parts[3]) - 1, int(parts[4])))
+    for _, _, blocks in transcripts.values():
+        blocks.sort()
+    return transcripts
+
+class CDSIndex:
+    """
+    Per-transcript CDS offset index for projecting protein positions onto the genome.
+
+    The CDS blocks of all transcripts are laid end to end in transcript (5' to 3') order, so
+    every block has a global start/end offset. A peptide's nucleotide range maps to a global
+    range, and np.searchsorted on the block ends finds the blocks it spans for all peptides
+    at once, whatever the strand or number of introns.
+    """
+    def __init__(self, transcripts):
+        keys = sorted(transcripts)
+        ids = [gene_id for gene_id, _ in keys]
+        # Transcripts of the same id are adjacent: id -> [first transcript, first transcript + count)
+        self.ids, self.id_first = np.unique(np.asarray(ids, dtype=object), return_index=True)
+        self.id_count = np.diff(np.append(self.id_first, len(keys)))
+        self.ids = pd.Index(self.ids)
+
+        self.chrom = np.asarray([transcripts[key][0] for key in keys], dtype=object)
+        self.strand = np.asarray([transcripts[key][1] for key in keys], dtype=object)
+        starts, ends, block_counts = [], [], []
+        for key in keys:
+            _, strand, blocks = transcripts[key]
+            ordered = blocks if strand != "-" else blocks[::-1]
+            starts.extend(start for start, _ in ordered)
+            ends.extend(end for _, end in ordered)
+            block_counts.append(len(blocks))
+        self.block_start = np.asarray(starts, dtype=np.int64)
+        self.block_end = np.asarray(ends, dtype=np.int64)
+        self.block_offset_end = np.cumsum(self.block_end - self.block_start)
+        self.block_offset_start = self.block_offset_end - (self.block_end - self.block_start)
+        first_block = np.concatenate(([0], np.cumsum(block_counts)))[:-1].astype(np.int64)
+        self.transcript_offset = self.block_offset_start[first_block] if len(first_block) else np.empty(0, dtype=np.int64)
+        self.transcript_length = np.asarray([sum(end - start for start, end in transcripts[key][2]) for key in keys], dtype=np.int64)
+
+    @classmethod
+    def from_gtf(cls, gtf_path, id_attribute="gene_id", coordinate_ids=()):
+        """
+        Index the CDS blocks of a GTF. IDs in coordinate_ids that are not in the GTF but look
+        like chrom:start-end:strand are indexed as single unspliced blocks.
+        """
+        transcripts = read_cds_blocks(gtf_path, id_attribute)
+        known = {gene_id for gene_id, _ in transcripts}
+        for gene_id in coordinate_ids:
+            match = COORDINATE_RE.match(str(gene_id))
+            if gene_id not in known and match:
+                chrom, start, end, strand = match.groups()
+                transcripts[(gene_id, "")] = (chrom, strand, [(int(start) - 1, int(end))])
+        return cls(transcripts)
+
+    def project(self, gene_ids, starts, ends, names=None):
+        """
+        Project peptides (1-based inclusive residue positions in the protein of gene_id) onto
+        every transcript of their gene_id. Returns a BED12 DataFrame, one row per peptide and
+        transcript; peptides whose id is unknown or whose range runs past the CDS are dropped.
+        """
+        gene_ids = np.asarray(gene_ids, dtype=object)
+        names = gene_ids if names is None else np.asarray(names, dtype=object)
+        starts = pd.to_numeric(pd.Series(starts), errors="coerce").to_numpy(dtype=float)
+        ends = pd.to_numeric(pd.Series(ends), errors="coerce").to_numpy(dtype=float)
+
+        # Peptide x transcript rows
+        positions = self.ids.get_indexer(gene_ids)
+        valid = np.flatnonzero((positions >= 0) & ~np.isnan(starts) & ~np.isnan(ends) & (starts >= 1) & (ends >= starts))
+        counts = self.id_count[positions[valid]]
+        peptides = np.repeat(valid, counts)
+        transcripts = np.repeat(self.id_first[positions[valid]], counts) + \
+            (np.arange(len(peptides)) - np.repeat(np.cumsum(counts) - counts, counts))
+
+        # Nucleotide range of each peptide in its transcript's CDS, then in global offsets
+        nt_start = (starts[peptides].astype(np.int64) - 1) * 3
+        nt_end = ends[peptides].astype(np.int64) * 3
+        inside = nt_end <= self.transcript_length[transcripts]
+        peptides, transcripts, nt_start, nt_end = peptides[inside], transcripts[inside], nt_start[inside], nt_end[inside]
+        global_start = self.transcript_offset[transcripts] + nt_start
+        global_end = self.transcript_offset[transcripts] + nt_end
+
+        first = np.searchsorted(self.block_offset_end, global_start, side="right")
+        last = np.searchsorted(self.block_offset_end, global_end - 1, side="right")
+
+        # One row per (projection, block) piece
+        piece_counts = last - first + 1
+        projection = np.repeat(np.arange(len(first)), piece_counts)
+        block = np.repeat(first, piece_counts) + (np.arange(len(projection)) - np.repeat(np.cumsum(piece_counts) - piece_counts, piece_counts))
+        low = np.maximum(global_start[projection], self.block_offset_start[block]) - self.block_offset_start[block]
+        high = np.minimum(global_end[projection], self.block_offset_end[block]) - self.block_offset_start[block]
+        minus = self.strand[transcripts[projection]] == "-"
+        piece_start = np.where(minus, self.block_end[block] - high, self.block_start[block] + low)
+        piece_end = np.where(minus, self.block_end[block] - low, self.block_start[block] + high)
+
+        # BED12 blocks are listed in genomic order
+        order = np.lexsort((piece_start, projection))
+        piece_start, piece_end = piece_start[order], piece_end[order]
+        first_piece = np.cumsum(piece_counts) - piece_counts
+        last_piece = first_piece + piece_counts - 1
+        chrom_start, chrom_end = piece_start[first_piece], piece_end[last_piece]
+        sizes = np.asarray([f"{size}," for size in (piece_end - piece_start).tolist()], dtype=object)
+        offsets = np.asarray([f"{offset}," for offset in (piece_start - np.repeat(chrom_start, piece_counts)).tolist()], dtype=object)
+        block_sizes, block_starts = sizes[first_piece], offsets[first_piece]
+        # Most peptides sit in one block; spliced ones are joined per block count, as the pieces
+        # of n projections with k blocks each form an (n, k) array
+        for k in np.unique(piece_counts[piece_counts > 1]):
+            spliced = np.flatnonzero(piece_counts == k)
+            pieces = (first_piece[spliced][:, None] + np.arange(k)).ravel()
+            block_sizes[spliced] = ["".join(row) for row in sizes[pieces].reshape(-1, k).tolist()]
+            block_starts[spliced] = ["".join(row) for row in offsets[pieces].reshape(-1, k).tolist()]
+
+        return pd.DataFrame({
+            "chrom": self.chrom[transcripts],
+            "chromStart": chrom_start,
+            "chromEnd": chrom_end,
+            "name": names[peptides],
+            "score": 0,
+            "strand": self.strand[transcripts],
+            "thickStart": chrom_start,
+            "thickEnd": chrom_end,
+            "itemRgb": "0",
+            "blockCount": piece_counts,
+            "blockSizes": block_sizes,
+            "blockStarts": block_starts,
+        }, columns=BED12_COLUMNS)
+
+def main():
+    parser = argparse.ArgumentParser(description="Project tryptic peptide matches onto the genome as a BED12 track.")
+    parser.add_argument("matches_csv", help="Output of find_unique_tryptic_peptides.py (gene_id, tryptic_peptide, tryptic_peptide_start, tryptic_peptide_end)")
+    parser.add_argument("smorf_gtf", help="smORF GTF with the CDS blocks of every smORF")
+    parser.add_argument("output_bed", help="Output BED12, e.g. next to Results/Annotations/Brain_Microproteins_Salk_Discovery_CDS.bed")
+    parser.add_argument("--id_attribute", default="gene_id", help="GTF attribute matching the gene_id column (default: gene_id)")
+    args = parser.parse_args()
+
+    matches = pd.read_csv(args.matches_csv, dtype={"gene_id": str, "tryptic_peptide": str})
+    index = CDSIndex.from_gtf(args.smorf_gtf, args.id_attribute, coordinate_ids=matches["gene_id"].dropna().unique())
+    bed = index.project(matches["gene_id"], matches["tryptic_peptide_start"], matches["tryptic_peptide_end"],
+                        names=matches["tryptic_peptide"])
+    bed = bed.sort_values(["chrom", "chromStart", "chromEnd"], kind="stable")
+    bed.to_csv(args.output_bed, sep="\t", header=False, index=False)
+    print(f"Projected {len(bed)} peptide placements from {len(matches)} matches; saved in {args.output_bed}")
+
+if __name__ == '__main__':
+    main()
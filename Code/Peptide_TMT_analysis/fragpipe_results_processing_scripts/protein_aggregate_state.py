@@ -0,0 +1,117 @@
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from protein_columns import COUNT_COLUMNS, join_pair_values
+
+# Bump when the stored tables change so older states are rebuilt
+STATE_FORMAT_VERSION = 1
+STATE_HEADER = f"#protein_aggregate_state\t{STATE_FORMAT_VERSION}"
+
+BATCH_COLUMNS = ['path', 'mtime_ns', 'size']
+PAIR_COLUMNS = ['Protein', 'Indistinguishable Proteins', 'batch', 'row']
+
+def default_state_dir(output_csv):
+    return f"{os.path.splitext(output_csv)[0]}_state"
+
+def file_signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+def _read_table(path, dtype):
+    # Stored values are written verbatim, so nothing is parsed as NaN
+    return pd.read_csv(path, sep="\t", dtype=dtype, keep_default_na=False, na_values=[])
+
+class ProteinAggregateState:
+    """
+    Aggregate of the protein.tsv files folded in by earlier --incremental runs, kept as TSVs
+    in a directory:
+      batches.tsv  every file folded in, with its mtime and size when it was read
+      counts.tsv   summed Unique/Razor Spectral Count per Protein
+      pairs.tsv    distinct (Protein, Indistinguishable Proteins) values, with the file and
+                   row where each was first seen
+    The first-seen positions let values be joined in the order of a full run even when a
+    new batch sorts before batches already folded in.
+    """
+    def __init__(self, state_dir):
+        self.state_dir = state_dir
+        self.batches, self.counts, self.pairs = self.__load()
+
+    @staticmethod
+    def __empty():
+        return ({}, pd.DataFrame(columns=['Protein'] + COUNT_COLUMNS).astype({column: "Int64" for column in COUNT_COLUMNS}),
+                pd.DataFrame(columns=PAIR_COLUMNS))
+
+    def __load(self):
+        batches_path = os.path.join(self.state_dir, "batches.tsv")
+        if not os.path.exists(batches_path):
+            return self.__empty()
+        with open(batches_path, "r") as f:
+            if f.readline().rstrip("\n") != STATE_HEADER:
+                print(f"{self.state_dir} was written by another version; rebuilding the aggregate")
+                return self.__empty()
+            batches = pd.read_csv(f, sep="\t", dtype={'path': str, 'mtime_ns': np.int64, 'size': np.int64})
+        counts = _read_table(os.path.join(self.state_dir, "counts.tsv"), {'Protein': str, **{column: "Int64" for column in COUNT_COLUMNS}})
+        pairs = _read_table(os.path.join(self.state_dir, "pairs.tsv"), {'Protein': str, 'Indistinguishable Proteins': str, 'batch': str, 'row': np.int64})
+        folded = {path: (mtime_ns, size) for path, mtime_ns, size in batches[BATCH_COLUMNS].itertuples(index=False)}
+        return folded, counts, pairs
+
+    def save(self):
+        tmp_dir = f"{self.state_dir}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        with open(os.path.join(tmp_dir, "batches.tsv"), "w") as f:
+            f.write(STATE_HEADER + "\n")
+            pd.DataFrame([(path, *signature) for path, signature in self.batches.items()], columns=BATCH_COLUMNS).to_csv(f, sep="\t", index=False)
+        self.counts.to_csv(os.path.join(tmp_dir, "counts.tsv"), sep="\t", index=False)
+        self.pairs.to_csv(os.path.join(tmp_dir, "pairs.tsv"), sep="\t", index=False)
+        # Swap the whole directory so counts are never saved without the batches they include
+        old_dir = f"{self.state_dir}.old"
+        if os.path.exists(self.state_dir):
+            os.replace(self.state_dir, old_dir)
+        os.replace(tmp_dir, self.state_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+    def update(self, protein_files, read_files):
+        """
+        Fold the protein files not yet in the state into it and return the aggregated
+        DataFrame, the same as a full run over protein_files. read_files(files) returns
+        [(file, DataFrame or None)]. If a file folded in earlier changed or is no longer
+        listed, its counts cannot be taken back out, so the aggregate is rebuilt.
+        """
+        current = {os.path.abspath(protein_file): file_signature(protein_file) for protein_file in protein_files}
+        changed = [path for path, signature in self.batches.items() if current.get(path) != signature]
+        if changed:
+            print(f"{len(changed)} aggregated batch file(s) changed or were removed; rebuilding the aggregate")
+            self.batches, self.counts, self.pairs = self.__empty()
+
+        new_files = [path for path in current if path not in self.batches]
+        print(f"{len(self.batches)} batch files already aggregated, reading {len(new_files)} new")
+
+        counts, pairs = [self.counts], [self.pairs]
+        for path, df in read_files(new_files):
+            self.batches[path] = current[path]
+            if df is None:
+                continue
+            df = df[df['Protein'].notna()]
+            counts.append(df.groupby('Protein', as_index=False)[COUNT_COLUMNS].sum())
+            pairs.append(pd.DataFrame({
+                'Protein': df['Protein'].to_numpy(),
+                'Indistinguishable Proteins': df['Indistinguishable Proteins'].fillna("BLANK").replace("", "BLANK").to_numpy(),
+                'batch': path,
+                'row': np.arange(len(df)),
+            }).drop_duplicates(['Protein', 'Indistinguishable Proteins']))
+
+        self.counts = pd.concat(counts, ignore_index=True).groupby('Protein', as_index=False)[COUNT_COLUMNS].sum()
+        # First-seen order of a full run: batch order of protein_files, then row
+        rank = {path: i for i, path in enumerate(current)}
+        pairs = pd.concat(pairs, ignore_index=True)
+        order = np.lexsort((pairs['row'].to_numpy(), pairs['batch'].map(rank).to_numpy()))
+        self.pairs = pairs.iloc[order].drop_duplicates(['Protein', 'Indistinguishable Proteins']).reset_index(drop=True)
+        self.save()
+
+        aggregated_df = self.counts.copy()
+        codes = pd.Index(aggregated_df['Protein']).get_indexer(self.pairs['Protein'])
+        aggregated_df['Indistinguishable Proteins'] = join_pair_values(
+            len(aggregated_df), codes, self.pairs['Indistinguishable Proteins'].to_numpy(dtype=object))
+        return aggregated_df
@@ -0,0 +1,23 @@
+import numpy as np
+import pandas as pd
+
+# Columns of protein.tsv that are aggregated per Protein, and the spectral counts summed
+REQUIRED_COLUMNS = ['Protein', 'Unique Spectral Count', 'Razor Spectral Count', 'Indistinguishable Proteins']
+COUNT_COLUMNS = ['Unique Spectral Count', 'Razor Spectral Count']
+
+def join_pair_values(n_proteins, pair_proteins, pair_values):
+    """
+    Join the values of each protein code with ";" in the order of the (protein code, value)
+    pairs. Most proteins have one value, so only the proteins with several are joined.
+    """
+    shared = pd.Series(pair_proteins).duplicated(keep=False).to_numpy()
+    protein_values = np.empty(n_proteins, dtype=object)
+    protein_values[pair_proteins[~shared]] = pair_values[~shared]
+    if shared.any():
+        # Stable sort keeps the pair order within each protein; split at protein boundaries
+        order = np.argsort(pair_proteins[shared], kind='stable')
+        shared_proteins = pair_proteins[shared][order]
+        boundaries = np.flatnonzero(np.diff(shared_proteins)) + 1
+        chunks = np.split(pair_values[shared][order], boundaries)
+        protein_values[shared_proteins[np.concatenate(([0], boundaries))]] = [";".join(chunk) for chunk in chunks]
+    return protein_values
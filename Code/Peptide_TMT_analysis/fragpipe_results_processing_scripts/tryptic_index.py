@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+import re
+import gzip
+import argparse
+import numpy as np
+import pandas as pd
+
+# Trypsin cleaves after K or R; with the proline rule, not when the next residue is P
+CLEAVAGE_SITES = {True: re.compile(r"(?<=[KR])(?!P)"), False: re.compile(r"(?<=[KR])")}
+
+# I and L have the same mass, so MS cannot tell peptides differing only by I/L apart
+IL_TABLE = str.maketrans("I", "L")
+
+def digest(sequence, missed_cleavages=2, min_length=7, max_length=50, proline_rule=True, clip_n_term_m=True):
+    """
+    Yield the tryptic peptides of a protein sequence with up to missed_cleavages missed
+    cleavages and a length in [min_length, max_length]. With clip_n_term_m, peptides of the
+    sequence without its initiator methionine are included too, as FragPipe searches them.
+    """
+    sequence = sequence.upper().rstrip("*")
+    sites = [0] + [m.start() for m in CLEAVAGE_SITES[proline_rule].finditer(sequence) if 0 < m.start() < len(sequence)] + [len(sequence)]
+    starts = [(i, sites[i]) for i in range(len(sites) - 1)]
+    if clip_n_term_m and sequence.startswith("M") and len(sites) > 1 and sites[1] > 1:
+        starts.append((0, 1))
+    for i, start in starts:
+        for j in range(i + 1, min(i + 2 + missed_cleavages, len(sites))):
+            length = sites[j] - start
+            if length > max_length:
+                break
+            if length >= min_length:
+                yield sequence[start:sites[j]]
+
+def read_fasta(path):
+    """
+    Yield (protein ID, sequence) from a plain or gzipped FASTA; the ID is the first word of the header.
+    """
+    with (gzip.open(path, "rt") if path.endswith(".gz") else open(path, "r")) as f:
+        protein, chunks = None, []
+        for line in f:
+            line = line.strip()
+            if line.startswith(">"):
+                if protein is not None:
+                    yield protein, "".join(chunks)
+                protein, chunks = (line[1:].split() or [""])[0], []
+            elif line:
+                chunks.append(line)
+        if protein is not None:
+            yield protein, "".join(chunks)
+
+def read_sequences(path, sequence_column="sequence", id_column=None):
+    """
+    (protein IDs, sequences) from a FASTA or from a CSV such as microprotein_master.csv.
+    For a CSV, proteins are keyed by id_column (by the sequence itself by default), and
+    repeated IDs are kept once, so rows repeating a sequence do not make its peptides shared.
+    """
+    if path.endswith((".csv", ".csv.gz")):
+        columns = [sequence_column] if id_column in (None, sequence_column) else [id_column, sequence_column]
+        df = pd.read_csv(path, usecols=columns, dtype=str).dropna(subset=[sequence_column])
+        df = df.drop_duplicates(subset=[id_column or sequence_column])
+        return df[id_column or sequence_column].tolist(), df[sequence_column].tolist()
+    proteins, sequences = [], []
+    seen = set()
+    for protein, sequence in read_fasta(path):
+        if protein not in seen:
+            seen.add(protein)
+            proteins.append(protein)
+            sequences.append(sequence)
+    return proteins, sequences
+
+class TrypticIndex:
+    """
+    Peptide -> protein index over an in-silico tryptic digest of a sequence database.
+
+    Every protein is digested once. The distinct peptides are held in a hashed pd.Index and the
+    proteins of each peptide in one array of protein numbers, grouped by peptide with offsets,
+    so a bulk query is a single vectorised get_indexer over the query peptides. With equate_il,
+    peptides are stored and looked up with I replaced by L.
+    """
+    def __init__(self, proteins, sequences, missed_cleavages=2, min_length=7, max_length=50,
+                 proline_rule=True, clip_n_term_m=True, equate_il=True):
+        self.proteins = np.asarray(proteins, dtype=object)
+        self.equate_il = equate_il
+
+        peptides, owners = [], []
+        for protein_number, sequence in enumerate(sequences):
+            digested = set(digest(sequence, missed_cleavages, min_length, max_length, proline_rule, clip_n_term_m))
+            if equate_il:
+                digested = {peptide.translate(IL_TABLE) for peptide in digested}
+            peptides.extend(digested)
+            owners.extend([protein_number] * len(digested))
+
+        codes, uniques = pd.factorize(pd.Series(peptides, dtype=object))
+        self.peptides = pd.Index(uniques)
+        self.offsets = np.concatenate(([0], np.cumsum(np.bincount(codes, minlength=len(uniques)))))
+        self.owners = np.asarray(owners, dtype=np.int64)[np.argsort(codes, kind="stable")]
+
+    @classmethod
+    def from_file(cls, path, sequence_column="sequence", id_column=None, **options):
+        return cls(*read_sequences(path, sequence_column, id_column), **options)
+
+    def __len__(self):
+        return len(self.peptides)
+
+    def __positions(self, peptides):
+        keys = pd.Series(peptides, dtype=object).str.upper()
+        if self.equate_il:
+            keys = keys.str.replace("I", "L", regex=False)
+        return self.peptides.get_indexer(keys.to_numpy(dtype=object))
+
+    def protein_counts(self, peptides):
+        """
+        Number of database proteins containing each peptide (0 if none).
+        """
+        positions = self.__positions(peptides)
+        # Only found peptides index the counts, so an empty index is looked up without error
+        counts = np.zeros(len(positions), np.int64)
+        found = positions >= 0
+        counts[found] = np.diff(self.offsets)[positions[found]]
+        return counts
+
+    def is_unique(self, peptides):
+        """
+        True for peptides found in exactly one database protein.
+        """
+        return self.protein_counts(peptides) == 1
+
+    def proteins_of(self, peptides):
+        """
+        The database proteins containing each peptide, as lists of IDs.
+        """
+        return [self.proteins[self.owners[self.offsets[position]:self.offsets[position + 1]]].tolist() if position >= 0 else []
+                for position in self.__positions(peptides)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Check tryptic peptides for uniqueness against an in-silico digest of a sequence database.")
+    parser.add_argument("database", help="FASTA, or CSV with a sequence column (e.g. microprotein_master.csv)")
+    parser.add_argument("peptides_file", help="Peptides to look up, one per line")
+    parser.add_argument("output_tsv", help="Output TSV of peptide, protein_count, proteins")
+    parser.add_argument("--id_column", help="CSV column identifying proteins (default: the sequence itself)")
+    parser.add_argument("--missed_cleavages", type=int, default=2, help="Maximum missed cleavages (default: 2)")
+    parser.add_argument("--min_length", type=int, default=7, help="Minimum peptide length (default: 7)")
+    parser.add_argument("--max_length", type=int, default=50, help="Maximum peptide length (default: 50)")
+    parser.add_argument("--no_proline_rule", action="store_true", help="Also cleave K/R followed by P")
+    parser.add_argument("--distinguish_il", action="store_true", help="Treat I and L as different residues")
+    args = parser.parse_args()
+
+    index = TrypticIndex.from_file(args.database, id_column=args.id_column, missed_cleavages=args.missed_cleavages,
+                                   min_length=args.min_length, max_length=args.max_length,
+                                   proline_rule=not args.no_proline_rule, equate_il=not args.distinguish_il)
+    print(f"Indexed {len(index)} peptides from {len(index.proteins)} proteins")
+
+    with open(args.peptides_file, "r") as f:
+        peptides = [line.strip() for line in f if line.strip()]
+    out_df = pd.DataFrame({"peptide": peptides, "protein_count": index.protein_counts(peptides)})
+    out_df["proteins"] = [";".join(proteins) for proteins in index.proteins_of(peptides)]
+    out_df.to_csv(args.output_tsv, sep="\t", index=False)
+    print(f"{int((out_df['protein_count'] == 1).sum())} of {len(out_df)} peptides are unique; results saved in {args.output_tsv}")
+
+if __name__ == '__main__':
+    main()